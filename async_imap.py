@@ -0,0 +1,429 @@
+import asyncio
+import email
+import queue
+import re
+import ssl
+import threading
+from collections import deque
+from email.message import Message
+from email.parser import BytesFeedParser
+from config import (
+    EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER, IMAP_TIMEOUT_SECONDS, IMAP_SYNC_STATE,
+    HEADER_BATCH_SIZE, FETCH_INCREMENTAL, ASYNC_PIPELINE_DEPTH, KEYWORD_SKIPPED,
+)
+from email_processor import (
+    SKIPPED_EMAILS, compute_fetch_window, build_search_criteria, mailbox_state_key,
+    incremental_search_criteria, next_high_water_mark, parse_search_uids, save_mailbox_state,
+    parse_fetch_response, find_fetch_literal, header_fetch_query, collect_header_candidates,
+    plan_body_fetches, section_fetch_query, plan_byte_batches, parsed_from_message,
+)
+from bodystructure import text_message_parser
+from header_rules import report_rejections
+from imap_keywords import account_mailbox, unkeyword_criteria, remember_location, mark_uids
+from imap_session import compress_uid_set, quote_string
+from utils import load_json_file
+
+LITERAL_RE = re.compile(rb"\{(\d+)\}\r\n$")
+RESPONSE_CODE_RE = re.compile(rb"\[(UIDVALIDITY|UIDNEXT|HIGHESTMODSEQ) (\d+)\]", re.IGNORECASE)
+UNTAGGED_FETCH_RE = re.compile(rb"^\* (\d+) FETCH ", re.IGNORECASE)
+PERMANENTFLAGS_RE = re.compile(rb"\[PERMANENTFLAGS \(([^)]*)\)\]", re.IGNORECASE)
+UID_RE = re.compile(rb"\bUID (\d+)", re.IGNORECASE)
+LITERAL_SECTION_RE = re.compile(rb"(BODY\[[^\]]*\])(?:<\d+>)? \{\d+\}\r\n$", re.IGNORECASE)  # Item a literal belongs to
+LITERAL_CHUNK_BYTES = 64 * 1024  # Streamed literals are read and parsed this much at a time
+
+
+class AsyncImapError(Exception):
+    """A tagged NO/BAD reply, or a connection that closed while commands were pending."""
+
+
+class AsyncImapClient:
+    """
+    Minimal IMAP4rev1 client on asyncio streams. A single reader task parses every server response
+    and routes it: tagged completions resolve the waiting command, untagged FETCH data is filed by UID
+    and other untagged lines are collected for SEARCH/SELECT. Because nothing waits for a reply before
+    the next command is written, several UID FETCH commands can be in flight on one connection.
+    Literals of UIDs fetched with `parser_for` are fed to a parser chunk by chunk as they arrive, so a
+    message is never held as raw bytes and as a parsed Message at the same time.
+    Unlike ImapSession there is no retry or reconnect: a dropped connection, a server silent for `timeout`
+    seconds while commands wait, or a reply that can't be parsed ends the scan with AsyncImapError.
+    """
+
+    def __init__(self, server=None, port=993, timeout=IMAP_TIMEOUT_SECONDS):
+        self.server = server or IMAP_SERVER
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.select_info = {}
+
+        self._tag = 0
+        self._pending = {}   # tag -> future resolved with the completion text
+        self._fetched = {}   # UID -> parsed FETCH items not yet claimed by their command
+        self._untagged = []  # Other untagged response lines
+        self._parsers = {}   # UID -> (FETCH item, e.g. b"BODY[1]", factory for the parser that item is streamed into)
+        self._reader_task = None
+        self._reader_error = None  # Why the reader stopped; later commands fail with it at once
+        self._last_read = 0.0      # Event loop time of the last bytes received
+
+    async def connect(self):
+        """Open the TLS connection and start the response reader."""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port, ssl=ssl.create_default_context()), self.timeout)
+        greeting = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not greeting.startswith(b"* OK"):
+            raise AsyncImapError(f"Unexpected greeting from {self.server}: {greeting!r}")
+        self._reader_task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def _read_response(self):
+        """Read one complete response, returned in imaplib's shape: (line, literal) tuples then the final line."""
+        parts = []
+        line = await self._readline()
+        if not line:
+            raise ConnectionError(f"{self.server} closed the connection")
+        while True:
+            match = LITERAL_RE.search(line)
+            if not match:
+                parts.append(line.rstrip(b"\r\n"))
+                return parts
+            literal = await self._read_literal(line, int(match.group(1)))
+            parts.append((line.rstrip(b"\r\n"), literal))
+            line = await self._readline()
+
+    async def _readline(self):
+        line = await self.reader.readline()
+        self._last_read = asyncio.get_running_loop().time()
+        return line
+
+    async def _read_chunks(self, size):
+        """Yield a literal's bytes LITERAL_CHUNK_BYTES at a time, noting each arrival for the idle timeout."""
+        loop = asyncio.get_running_loop()
+        remaining = size
+        while remaining:
+            chunk = await self.reader.readexactly(min(remaining, LITERAL_CHUNK_BYTES))
+            self._last_read = loop.time()
+            remaining -= len(chunk)
+            yield chunk
+
+    def _literal_parser(self, line):
+        """
+        A parser for the literal announced by `line` when it is the item registered for its UID, else None.
+        Servers may send UID after the literal; uid_fetch then parses the buffered bytes once the reply is in.
+        """
+        if not UNTAGGED_FETCH_RE.match(line):
+            return None
+        uid_match = UID_RE.search(line)
+        section_match = LITERAL_SECTION_RE.search(line)
+        if uid_match is None or section_match is None:
+            return None
+        registered = self._parsers.get(int(uid_match.group(1)))
+        if registered is None or registered[0] != section_match.group(1).upper():
+            return None
+        return registered[1](int(uid_match.group(1)))
+
+    async def _read_literal(self, line, size):
+        """Read a literal: into its registered parser (returning the Message) when one applies, else as bytes."""
+        parser = self._literal_parser(line)
+        if parser is None:
+            return b"".join([chunk async for chunk in self._read_chunks(size)])
+
+        async for chunk in self._read_chunks(size):
+            parser.feed(chunk)
+        return parser.close()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                parts = await self._read_response()
+                first = parts[0][0] if isinstance(parts[0], tuple) else parts[0]
+                if first.startswith(b"* "):
+                    self._handle_untagged(first, parts)
+                elif not first.startswith(b"+"):
+                    tag, _, text = first.partition(b" ")
+                    future = self._pending.pop(tag, None)
+                    if future is not None and not future.done():
+                        future.set_result(text)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            self._fail_pending(f"Connection lost: {e}", e)
+        except Exception as e:  # A reply (or a parser fed from it) we can't handle; nothing would resolve the futures
+            self._fail_pending(f"Could not read a response from {self.server}: {e!r}", e)
+
+    def _fail_pending(self, message, cause):
+        """Fail every waiting command, and any later one, with AsyncImapError(message) caused by `cause`."""
+        self._reader_error = AsyncImapError(message)
+        self._reader_error.__cause__ = cause
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(self._reader_error)
+        self._pending.clear()
+
+    def _handle_untagged(self, first, parts):
+        if not UNTAGGED_FETCH_RE.match(first):
+            self._untagged.append(first)
+            return
+        # Strip "* " and "FETCH " so parse_fetch_response sees what imaplib would have returned
+        def strip(line):
+            return UNTAGGED_FETCH_RE.sub(rb"\1 ", line, count=1)
+        imaplib_parts = [(strip(part[0]), part[1]) if isinstance(part, tuple) else part for part in parts]
+        if isinstance(imaplib_parts[0], bytes):
+            imaplib_parts[0] = strip(imaplib_parts[0])
+        for item in parse_fetch_response(imaplib_parts):
+            if item.get("UID") is not None:
+                self._fetched.setdefault(item["UID"], []).append(item)
+
+    async def command(self, *args):
+        """Send one command and wait for its tagged completion. Raises AsyncImapError unless it is OK."""
+        if self.writer is None:
+            raise AsyncImapError("Not connected")
+        if self._reader_error is not None:
+            raise AsyncImapError(str(self._reader_error)) from self._reader_error.__cause__
+        self._tag += 1
+        tag = f"A{self._tag:04d}".encode()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tag] = future
+        self.writer.write(tag + b" " + " ".join(args).encode() + b"\r\n")
+        await self.writer.drain()
+        text = await self._wait_for_reply(future)
+        if not text.upper().startswith(b"OK"):
+            raise AsyncImapError(f"{args[0]} failed: {text.decode(errors='replace')}")
+        return text
+
+    async def _wait_for_reply(self, future):
+        """
+        Await a command's completion. Large FETCHes may take much longer than `timeout` as a whole, so
+        only silence counts: a half-open connection never errors on its own, and the reader waits forever.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                if loop.time() - self._last_read >= self.timeout:
+                    self._fail_pending(f"No response from {self.server} for {self.timeout}s", None)
+                    if not future.done():
+                        raise self._reader_error
+                    return future.result()
+
+    async def login(self, address, password):
+        await self.command("LOGIN", quote_string(address), quote_string(password))
+
+    async def select(self, folder):
+        """SELECT a mailbox and return {"uidvalidity", "uidnext", "highestmodseq", "permanentflags"} from its response codes."""
+        self._untagged.clear()
+        text = await self.command("SELECT", quote_string(folder))
+        info = {"uidvalidity": None, "uidnext": None, "highestmodseq": None, "permanentflags": ()}
+        for line in self._untagged + [text]:
+            for name, value in RESPONSE_CODE_RE.findall(line):
+                info[name.decode().lower()] = int(value)
+            flags_match = PERMANENTFLAGS_RE.search(line)
+            if flags_match:
+                info["permanentflags"] = tuple(flags_match.group(1).decode(errors="replace").split())
+        self._untagged.clear()
+        self.select_info = info
+        return info
+
+    async def uid_search(self, *criteria):
+        """UID SEARCH; returns the response data the way imaplib does ([b"1 2 3"])."""
+        self._untagged.clear()
+        await self.command("UID SEARCH", *criteria)
+        results = [line[len(b"* SEARCH"):].strip() for line in self._untagged if line.upper().startswith(b"* SEARCH")]
+        self._untagged.clear()
+        return [b" ".join(results)]
+
+    async def uid_fetch(self, uids, query, parser_for=None, section=None):
+        """
+        UID FETCH; returns the parsed items (see parse_fetch_response) for the requested UIDs.
+        With `parser_for(uid)` (e.g. returning a BytesFeedParser) the literals of the `section` item
+        (e.g. "BODY[1]") are streamed into it and the items hold the resulting Message instead of bytes.
+        """
+        if parser_for is not None:
+            self._parsers.update(dict.fromkeys(uids, (section.upper().encode(), parser_for)))
+        try:
+            await self.command("UID FETCH", compress_uid_set(uids), query)
+        finally:
+            for uid in uids:
+                self._parsers.pop(uid, None)
+        items = [item for uid in uids for item in self._fetched.pop(uid, [])]
+        if parser_for is not None:
+            for item in items:
+                for key, value in item.items():
+                    if key.startswith(section.upper()) and isinstance(value, bytes):  # UID came after the literal
+                        parser = parser_for(item["UID"])
+                        parser.feed(value)
+                        item[key] = parser.close()
+        return items
+
+    async def logout(self):
+        """Log out and close the connection, ignoring errors from connections that are already gone."""
+        if self.writer is None:
+            return
+        try:
+            await asyncio.wait_for(self.command("LOGOUT"), self.timeout)
+        except (AsyncImapError, asyncio.TimeoutError, OSError):
+            pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ssl.SSLError, OSError):
+            pass
+        self.writer = None
+
+
+def _as_message(literal):
+    return literal if isinstance(literal, Message) else email.message_from_bytes(literal)
+
+
+async def _fetch_chunk_bodies(client, chunk, start_date, end_date, skipped_emails, mailbox):
+    """
+    Both fetch phases for one chunk. Returns ([uids in newest-first order], {uid: ParsedEmail});
+    only the records' decoded text outlives the chunk, so chunks fetched ahead stay small.
+    """
+    items = await client.uid_fetch(chunk, header_fetch_query())
+    auto_skipped = []
+    candidates, sizes, plans = collect_header_candidates(items, start_date, end_date, skipped_emails, auto_skipped)
+    mark_uids(mailbox, auto_skipped, KEYWORD_SKIPPED)  # Stored by imap_keywords.flush_all_pending
+
+    wanted = [uid for uid in chunk if uid in candidates]
+    bodies, full_fetch, by_section = plan_body_fetches(wanted, plans)
+
+    async def fetch_section(section, entries):
+        text_parts = dict(entries)
+        fetched = await client.uid_fetch(list(text_parts), section_fetch_query(section),
+                                         parser_for=lambda uid: text_message_parser(plans[uid][0], text_parts[uid]),
+                                         section=f"BODY[{section}]")
+        return {item.get("UID"): find_fetch_literal(item, f"BODY[{section}]") for item in fetched}
+
+    async def fetch_full(batch):
+        fetched = await client.uid_fetch(batch, "(BODY.PEEK[])", parser_for=lambda uid: BytesFeedParser(),
+                                         section="BODY[]")
+        return {item.get("UID"): find_fetch_literal(item, "BODY[]") for item in fetched}
+
+    # Every body FETCH of the chunk is written before any reply is awaited
+    requests = [fetch_section(section, entries) for section, entries in by_section.items()]
+    requests += [fetch_full(batch) for batch in plan_byte_batches(full_fetch, sizes)]
+    for result in await asyncio.gather(*requests):
+        bodies.update(result)
+    records = {uid: parsed_from_message(uid, candidates[uid], _as_message(literal))
+               for uid, literal in bodies.items() if literal is not None}
+    return wanted, records
+
+
+async def aiter_recent_recruiter_emails(days=None, hours=None, since=None, before=None, incremental=None,
+                                        folder="inbox", account=None, pipeline_depth=ASYNC_PIPELINE_DEPTH):
+    """
+    Async counterpart of fetch_recent_recruiter_emails: yields ParsedEmail records
+    newest first, using the same window, prefilter, text-part download and sync state.
+    Up to `pipeline_depth` chunks are fetched ahead of the consumer on a single connection, so
+    network round trips overlap with whatever the consumer does between items.
+    """
+    account = account or {}
+    address = account.get("address") or EMAIL_ADDRESS
+    password = account.get("password") or EMAIL_PASSWORD
+    client = AsyncImapClient(account.get("imap_server"))
+    mailbox = account_mailbox(folder, client.server, address, password)
+    start_date, end_date = compute_fetch_window(days, hours, since, before)
+    incremental = FETCH_INCREMENTAL if incremental is None else incremental
+
+    await client.connect()
+    in_flight = deque()
+    try:
+        await client.login(address, password)
+        select_info = await client.select(folder)
+
+        criteria = build_search_criteria(start_date, end_date) + unkeyword_criteria(select_info["permanentflags"])
+        print(f"🔍 Searching for emails from {start_date:%Y-%m-%d %H:%M} to {end_date:%Y-%m-%d %H:%M} ({' '.join(criteria)})...")
+        state_key = mailbox_state_key(folder, client.server, address)
+        mailbox_state = load_json_file(IMAP_SYNC_STATE).get(state_key, {})
+        narrowed = incremental_search_criteria(criteria, mailbox_state, select_info, incremental)
+        if narrowed is None:
+            return
+        criteria, last_uid = narrowed
+        email_ids = parse_search_uids(await client.uid_search(*criteria), last_uid, mailbox_state.get("deferred", ()))
+        print(f"📨 Found {len(email_ids)} emails.")
+        if not email_ids:
+            return
+
+        skipped_emails = load_json_file(SKIPPED_EMAILS)
+        chunks = deque(email_ids[i:i + HEADER_BATCH_SIZE] for i in range(0, len(email_ids), HEADER_BATCH_SIZE))
+        indexed = {}
+        while chunks or in_flight:
+            while chunks and len(in_flight) < max(1, pipeline_depth):
+                chunk = chunks.popleft()
+                in_flight.append(asyncio.create_task(
+                    _fetch_chunk_bodies(client, chunk, start_date, end_date, skipped_emails, mailbox)))
+
+            wanted, records = await in_flight.popleft()
+            for uid in wanted:
+                parsed = records.pop(uid, None)
+                if parsed is None:
+                    continue
+                email_date, sender, subject = parsed.email_date, parsed.sender, parsed.subject
+                indexed[uid] = [f"{email_date} - {sender}", sender, email_date.strftime('%Y-%m-%d %H:%M:%S')]
+                remember_location(f"{email_date} - {sender}", mailbox, uid)
+                print(f"\n📖 Processing Job Email: {email_date.strftime('%Y-%m-%d %H:%M:%S')} - {subject} (From: {sender})")
+                yield parsed
+
+        rejected = report_rejections()
+        if rejected:
+            print(f"🧹 Header rules rejected {rejected}.")
+        if select_info.get("uidvalidity") is not None:
+            last = next_high_water_mark(mailbox_state, select_info["uidvalidity"], email_ids)
+            save_mailbox_state(state_key, {"uidvalidity": select_info["uidvalidity"], "last_uid": last},
+                               indexed, undeferred=mailbox_state.get("deferred", ()))
+    finally:
+        for task in in_flight:
+            task.cancel()
+        await client.logout()
+
+
+def iter_in_background(make_async_iter, max_buffered=50):
+    """
+    Run an async iterator on an event loop in a background thread and yield its items here.
+    Fetching keeps going while the caller prompts or drafts replies; at most `max_buffered` items wait.
+    Exceptions from the iterator are re-raised in the caller.
+    """
+    items = queue.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def pump():
+        async_iter = make_async_iter()
+        try:
+            async for item in async_iter:
+                if not await asyncio.to_thread(put, item):
+                    break
+        finally:
+            await async_iter.aclose()
+
+    def run():
+        error = None
+        try:
+            asyncio.run(pump())
+        except Exception as e:
+            error = e
+        put((finished, error))
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is finished:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join(timeout=IMAP_TIMEOUT_SECONDS)
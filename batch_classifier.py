@@ -0,0 +1,85 @@
+"""
+Score many emails at once with the classifier's CUE_WEIGHTS, e.g. to re-score the whole message
+cache after a rule change:  python batch_classifier.py [folder]
+Requires NumPy (pip install numpy); nothing else in the responder imports this module.
+"""
+import email
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+from email_responder import CUE_WEIGHTS, cue_features
+from email_processor import mailbox_state_key, parsed_from_message
+from message_cache import MessageCache
+from parsed_email import ParsedEmail
+
+# Column order of the hit matrix: the features (reason codes) of CUE_WEIGHTS
+FEATURES = tuple(feature for feature, _, _ in CUE_WEIGHTS)
+FEATURE_COLUMNS = {feature: column for column, feature in enumerate(FEATURES)}
+REASONS = tuple(reason for _, _, reason in CUE_WEIGHTS)
+WEIGHTS = np.array([weight for _, weight, _ in CUE_WEIGHTS], dtype=np.int32)
+
+# is_job: bool per email, scores: int per email, hits: (emails, FEATURES) bool matrix
+BatchVerdicts = namedtuple("BatchVerdicts", "is_job scores hits")
+
+
+def feature_matrix(emails):
+    """
+    Cue hits for a batch as an (emails, len(FEATURES)) boolean matrix. Hits are collected as sparse
+    (row, column) pairs and scattered into the matrix in one assignment. `emails` is any iterable of
+    ParsedEmail records or (email_date, sender, subject, body) tuples and is consumed lazily, so each
+    record can be released as soon as its row is done.
+    """
+    rows, columns = [], []
+    count = 0
+    for item in emails:
+        parsed = item if isinstance(item, ParsedEmail) else ParsedEmail(*item)
+        for feature in cue_features(parsed.blob, parsed.sender.lower()):
+            rows.append(count)
+            columns.append(FEATURE_COLUMNS[feature])
+        count += 1
+    hits = np.zeros((count, len(FEATURES)), dtype=bool)
+    hits[rows, columns] = True
+    return hits
+
+
+def score_hits(hits, weights=WEIGHTS):
+    """Scores and verdicts for a hit matrix in one dot product; re-weighting needs no re-parsing."""
+    scores = hits.astype(np.int32) @ np.asarray(weights, dtype=np.int32)
+    return BatchVerdicts(scores > 0, scores, hits)
+
+
+def classify_batch(emails, weights=WEIGHTS):
+    """
+    Classify a whole batch. Returns BatchVerdicts whose arrays line up with `emails`; verdicts and
+    scores match email_responder.classify_text message by message, without its per-message logging.
+    """
+    return score_hits(feature_matrix(emails), weights)
+
+
+def reasons_for(hits_row):
+    """The classify_text reason strings for one row of a hit matrix."""
+    return [REASONS[column] for column in np.flatnonzero(hits_row)]
+
+
+def iter_cached_records(folder="inbox"):
+    """ParsedEmail records for every message in the MessageCache for a folder, unfiltered."""
+    for _, uid, raw_message in MessageCache().iter_mailbox(mailbox_state_key(folder)):
+        msg = email.message_from_bytes(raw_message)
+        yield parsed_from_message(uid, (msg.get("Date"), msg.get("From", ""), msg.get("Subject", "")), msg)
+
+
+def rescore_cache(folder="inbox"):
+    """Re-score every cached message of a folder and print the verdict and reason counts."""
+    started = time.monotonic()
+    verdicts = classify_batch(iter_cached_records(folder))
+    elapsed = time.monotonic() - started
+    print(f"🧮 Re-scored {len(verdicts.scores)} cached messages from {folder} in {elapsed:.1f}s: "
+          f"{int(verdicts.is_job.sum())} job related.")
+    for reason, count in zip(REASONS, verdicts.hits.sum(axis=0)):
+        print(f"   {reason}: {int(count)}")
+    return verdicts
+
+
+if __name__ == "__main__":
+    rescore_cache(sys.argv[1] if len(sys.argv) > 1 else "inbox")
@@ -0,0 +1,143 @@
+"""
+Micro-benchmarks for the per-message text work. Run with: python benchmarks.py
+Uses synthetic data only; no mail server or LLM is contacted.
+"""
+import re
+import timeit
+from html_text import html_to_text
+from email_responder import classify_text
+
+
+def regex_clean_html_processor(raw_html):
+    """The former email_processor.clean_html."""
+    return re.sub(r'<.*?>', '', raw_html).strip()
+
+
+def regex_clean_html_responder(raw_html):
+    """The former email_responder.clean_html."""
+    text = re.sub(r"<[^>]+>", " ", raw_html)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def former_classify_text(blob, s_sender):
+    """The former email_responder.classify_text: cue lists rebuilt per call, one substring scan per cue."""
+
+    # Strong negatives: newsletters / job boards / marketing platforms
+    job_board_domains = [
+        "@dice.com", "@connect.dice.com", "@alerts.indeed.com", "@indeed.com",
+        "@notifications.linkedin.com", "@linkedin.com", "@ziprecruiter.com",
+        "@monster.com", "@glassdoor.com"
+    ]
+    marketing_platform_hints = [
+        "mailchimp", "sendgrid", "constantcontact", "hubspot", "marketo",
+        "pardot", "klaviyo", "mailgun", "sendinblue", "campaign", "mailer"
+    ]
+    marketing_sender_hints = [
+        "noreply", "no-reply", "donotreply", "info@", "sales@", "marketing@",
+        "newsletter@", "support@", "hello@", "team@", "updates@", "alerts@", "notifications@"
+    ]
+    newsletter_phrases = [
+        "unsubscribe", "manage preferences", "view in browser",
+        "knowledge center", "digest", "job alert", "recommended jobs",
+        "intellisearch alert", "terms & conditions", "privacy policy"
+    ]
+
+    # Negatives: solar/retail sales outreach cues
+    solar_terms = [
+        "solar", "photovoltaic", "pv", "panel", "site survey", "proposal",
+        "estimate", "quote", "kwh", "net metering", "nem", "utility bill",
+        "pge", "pg&e", "roof", "installer", "powerwall", "inverter"
+    ]
+    sales_cta = [
+        "schedule a call", "book a call", "book time", "get a quote", "free estimate",
+        "demo", "webinar", "limited time", "discount", "promo", "promotion", "save"
+    ]
+
+    # Positives: recruiter/job outreach cues
+    strong_pos = ["recruiter", "talent acquisition", "sourcer", "hiring manager"]
+    medium_pos = [
+        "contract", "contract-to-hire", "c2c", "w2", "1099", "interview",
+        "open role", "opening", "role", "position", "rate", "bill rate", "pay rate"
+    ]
+
+    score = 0
+    reasons = []
+
+    # Positives
+    if any(p in blob for p in strong_pos):
+        score += 3
+        reasons.append("strong recruiter cue")
+    if any(p in blob for p in medium_pos):
+        score += 1
+        reasons.append("job terms")
+    # numeric rate with hr/hour nearby
+    if re.search(r"\$?\s*\d+(?:\.\d{1,2})?\s*/?\s*(?:hr|hour)\b", blob):
+        score += 1
+        reasons.append("rate w/ hr")
+
+    # Negatives (heavier)
+    if any(d in s_sender for d in job_board_domains):
+        score -= 3
+        reasons.append("job board domain")
+    if any(h in s_sender for h in marketing_sender_hints):
+        score -= 2
+        reasons.append("marketing-y sender")
+    if any(p in blob for p in marketing_platform_hints):
+        score -= 2
+        reasons.append("marketing platform")
+    if any(p in blob for p in newsletter_phrases):
+        score -= 2
+        reasons.append("newsletter phrasing")
+    if any(p in blob for p in sales_cta):
+        score -= 2
+        reasons.append("sales CTA")
+    if any(p in blob for p in solar_terms):
+        score -= 3
+        reasons.append("solar/retail sales")
+
+    is_job = score > 0
+    return is_job, score, reasons
+
+
+def marketing_html(rows=1500):
+    """A large newsletter-style message: head styles, tracking script, nested tables and entities."""
+    style = "<style>" + ".c{color:#333;font-family:Arial} " * 400 + "</style>"
+    script = "<script>var t = {" + ",".join(f"k{i}: '{i}'" for i in range(400)) + "};</script>"
+    row = ('<tr><td class="c" style="padding:4px"><a href="https://example.com/jobs?id={0}&amp;src=mail">'
+           'Senior Python Developer &ndash; Remote &amp; Contract</a></td><td>$85/hr&nbsp;C2C</td></tr>\n')
+    body = "".join(row.format(i) for i in range(rows))
+    return (f"<html><head><title>Jobs digest</title>{style}</head><body>{script}"
+            f"<table>{body}</table><p>Unsubscribe &middot; Manage preferences</p></body></html>")
+
+
+def bench(label, func, data, number):
+    seconds = timeit.timeit(lambda: func(data), number=number) / number
+    print(f"  {label:<34} {seconds * 1000:8.2f} ms/msg  {len(data) / seconds / 1e6:7.1f} MB/s")
+
+
+def bench_html_to_text():
+    for rows in (1500, 6000):
+        data = marketing_html(rows)
+        print(f"HTML to text ({len(data) / 1024:.0f} KiB newsletter):")
+        bench("regex <.*?> (email_processor)", regex_clean_html_processor, data, 20)
+        bench("regex <[^>]+> + \\s+ (responder)", regex_clean_html_responder, data, 20)
+        bench("html_to_text (20k char cap)", html_to_text, data, 20)
+        bench("html_to_text (no cap)", lambda text: html_to_text(text, max_chars=0), data, 5)
+    print(f"  style/script text left by regex: {'.c{color' in regex_clean_html_responder(data)}, "
+          f"by html_to_text: {'.c{color' in html_to_text(data)}")
+
+
+def bench_classifier():
+    recruiter = ("hi steven, i'm a technical recruiter at acme staffing with a 6 month contract-to-hire role "
+                 "for a senior python developer, remote, $85/hr on c2c. are you open to a quick call? ") * 6
+    newsletter = html_to_text(marketing_html(1500)).lower()
+    unrelated = ("lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. " * 250)[:20000]
+    for label, blob in (("recruiter email", recruiter), ("newsletter", newsletter), ("no cues", unrelated)):
+        print(f"Classifier ({label}, {len(blob):,} chars):")
+        bench("substring scans (former)", lambda text: former_classify_text(text, "jane@acme.com"), blob, 200)
+        bench("compiled word index", lambda text: classify_text(text, "jane@acme.com"), blob, 200)
+
+
+if __name__ == "__main__":
+    bench_html_to_text()
+    bench_classifier()
@@ -0,0 +1,126 @@
+import re
+from collections import namedtuple
+from email.parser import BytesFeedParser
+
+# One token of an IMAP parenthesized list: "(", ")", a quoted string, a literal marker or an atom
+TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|(\{\d+\}))|\s*([^\s()"{]+)')
+
+# The text part worth downloading: section number for BODY[...], plus what's needed to decode it
+TextPart = namedtuple("TextPart", "section subtype charset encoding size")
+
+
+def parse_bodystructure(data, start=0):
+    """
+    Parse the parenthesized BODYSTRUCTURE value starting at data[start] into nested lists.
+    Quoted strings and atoms become str, NIL becomes None. Raises ValueError on malformed
+    input or embedded literals (imaplib splits those across response parts).
+    """
+    stack = [[]]
+    pos = start
+    while True:
+        match = TOKEN_RE.match(data, pos)
+        if not match:
+            raise ValueError(f"Unparsable BODYSTRUCTURE near {data[pos:pos + 40]!r}")
+        pos = match.end()
+        open_paren, close_paren, quoted, literal, atom = match.groups()
+
+        if open_paren:
+            stack.append([])
+        elif close_paren:
+            if len(stack) < 2:
+                raise ValueError("Unbalanced BODYSTRUCTURE")
+            finished = stack.pop()
+            stack[-1].append(finished)
+            if len(stack) == 1:
+                return stack[0][0], pos
+        elif literal:
+            raise ValueError("BODYSTRUCTURE contains a literal")
+        elif quoted is not None:
+            stack[-1].append(re.sub(rb"\\(.)", rb"\1", quoted).decode("utf-8", errors="replace"))
+        else:
+            value = atom.decode("ascii", errors="replace")
+            stack[-1].append(None if value.upper() == "NIL" else value)
+
+
+def find_bodystructure(fragment):
+    """Return the parsed BODYSTRUCTURE contained in a FETCH response fragment, or None."""
+    index = fragment.upper().find(b"BODYSTRUCTURE (")
+    if index < 0:
+        return None
+    try:
+        structure, _ = parse_bodystructure(fragment, index + len(b"BODYSTRUCTURE "))
+    except ValueError:
+        return None
+    return structure
+
+
+def _iter_leaf_parts(structure, prefix=""):
+    """Yield (section, part) for every non-multipart body part, in MIME order."""
+    if structure and isinstance(structure[0], list):  # Multipart: child parts, then the subtype
+        number = 0
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            number += 1
+            yield from _iter_leaf_parts(child, f"{prefix}.{number}" if prefix else str(number))
+    else:
+        yield prefix or "1", structure  # A non-multipart message is part 1
+
+
+def _field(part, index):
+    return part[index] if len(part) > index else None
+
+
+def select_text_part(structure):
+    """
+    Pick the part extract_email_body would use: the first inline text/plain, else the first inline
+    text/html. Returns a TextPart, or None when the message has no usable text.
+    """
+    html_part = None
+    for section, part in _iter_leaf_parts(structure):
+        if len(part) < 7 or not isinstance(part[0], str) or not isinstance(part[1], str):
+            continue
+        if part[0].lower() != "text" or part[1].lower() not in ("plain", "html"):
+            continue
+
+        disposition = _field(part, 9)  # text parts: ... size lines md5 disposition
+        if isinstance(disposition, list) and str(disposition[0] or "").lower() == "attachment":
+            continue
+
+        params = part[2] if isinstance(part[2], list) else []
+        param_map = {str(params[i]).lower(): params[i + 1] for i in range(0, len(params) - 1, 2)}
+        try:
+            size = int(part[6])
+        except (TypeError, ValueError):
+            size = 0
+        text_part = TextPart(section, part[1].lower(), param_map.get("charset"), (part[5] or "7bit").lower(), size)
+
+        if text_part.subtype == "plain":
+            return text_part
+        if html_part is None:
+            html_part = text_part
+    return html_part
+
+
+def build_text_message(header_bytes, text_part, body_bytes):
+    """
+    Rebuild a minimal single-part message from the prefetched headers and one fetched body section,
+    so it can go through email.message_from_bytes/extract_email_body and the message cache unchanged.
+    """
+    content_type = f"text/{text_part.subtype}" if text_part else "text/plain"
+    if text_part and text_part.charset:
+        content_type += f'; charset="{text_part.charset}"'
+    encoding = text_part.encoding if text_part else "7bit"
+    mime_headers = (f"MIME-Version: 1.0\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Transfer-Encoding: {encoding}\r\n\r\n").encode()
+    return header_bytes.rstrip(b"\r\n") + b"\r\n" + mime_headers + (body_bytes or b"")
+
+
+def text_message_parser(header_bytes, text_part):
+    """
+    BytesFeedParser already fed the headers build_text_message would produce, so the section's bytes
+    can be fed in as they come off the wire instead of being joined into one message first.
+    """
+    parser = BytesFeedParser()
+    parser.feed(build_text_message(header_bytes, text_part, b""))
+    return parser
@@ -8,6 +8,100 @@ EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")
 SMTP_SERVER = "smtp.mail.yahoo.com"
 IMAP_SERVER = "imap.mail.yahoo.com"
 
+# Mailboxes scanned by main.py. Every (account, folder) pair keeps its own incremental sync state
+# and all of them are scanned concurrently into one interleaved stream. Yahoo files spam under "Bulk".
+ACCOUNTS = [
+    {"address": EMAIL_ADDRESS, "password": EMAIL_PASSWORD, "imap_server": IMAP_SERVER,
+     "folders": ["inbox", "Bulk"]},
+]
+# Optional second (consulting) mailbox
+if os.environ.get("CONSULTING_EMAIL_ADDRESS"):
+    ACCOUNTS.append({
+        "address": os.environ.get("CONSULTING_EMAIL_ADDRESS"),
+        "password": os.environ.get("CONSULTING_EMAIL_PASSWORD"),
+        "imap_server": os.environ.get("CONSULTING_IMAP_SERVER", IMAP_SERVER),
+        "folders": ["inbox"],
+    })
+
+# Fetch window: how far back to scan. SINCE/BEFORE are pushed down into the
+# IMAP SEARCH so only candidate messages are ever fetched. FETCH_SINCE and
+# FETCH_BEFORE take ISO dates ("2025-01-28" or "2025-01-28T09:00") and override
+# the rolling days/hours window when set.
+FETCH_WINDOW_DAYS = int(os.environ.get("FETCH_WINDOW_DAYS", "4"))
+FETCH_WINDOW_HOURS = int(os.environ.get("FETCH_WINDOW_HOURS", "0"))
+FETCH_SINCE = os.environ.get("FETCH_SINCE")
+FETCH_BEFORE = os.environ.get("FETCH_BEFORE")
+# Only fetch UIDs above the last run's high-water mark (set to 0 to rescan the whole window)
+FETCH_INCREMENTAL = os.environ.get("FETCH_INCREMENTAL", "1") != "0"
+
+# Fetch batching: header passes go by message count; body fetches are packed by RFC822.SIZE so
+# many small messages share a round trip and a huge one gets a batch of its own
+HEADER_BATCH_SIZE = 200
+FETCH_BATCH_BYTES = 4 * 1024 * 1024
+FETCH_BATCH_MAX_MESSAGES = 50
+# Only the text/plain (or text/html) part is downloaded, capped at this many bytes
+BODY_FETCH_MAX_BYTES = 65536
+
+# Parallel fetching for backfills: candidate UIDs are split across this many authenticated
+# connections. FETCH_MAX_CONNECTIONS caps it to stay inside the provider's connection limit.
+FETCH_CONNECTIONS = int(os.environ.get("FETCH_CONNECTIONS", "1"))
+FETCH_MAX_CONNECTIONS = 4
+
+# IMAP session resilience: failed commands are retried with exponential backoff + jitter,
+# reconnecting and re-selecting the mailbox when the connection itself broke
+IMAP_TIMEOUT_SECONDS = 60
+IMAP_MAX_RETRIES = 4
+IMAP_BACKOFF_BASE_SECONDS = 1
+IMAP_BACKOFF_MAX_SECONDS = 30
+
+# Processing state kept on the server as IMAP keywords, so handled mail is excluded by SEARCH
+# UNKEYWORD on every machine. Only used when the mailbox's PERMANENTFLAGS allow new keywords.
+IMAP_KEYWORDS = os.environ.get("IMAP_KEYWORDS", "1") != "0"
+KEYWORD_SKIPPED = "$RRSkipped"
+KEYWORD_REPLIED = "$RRReplied"
+KEYWORD_DRAFTED = "$RRDrafted"
+
+# Move mail skipped for good (noreply senders, "N" decisions) out of the scanned folders at the end
+# of each run, in one UID MOVE per mailbox, so the inbox being walked keeps shrinking
+ARCHIVE_SKIPPED = os.environ.get("ARCHIVE_SKIPPED", "0") == "1"
+ARCHIVE_FOLDER = os.environ.get("ARCHIVE_FOLDER", "Archive")
+
+# Email bodies are converted to at most this many characters of text (html_text.html_to_text)
+HTML_TEXT_MAX_CHARS = 20000
+
+# Drop quoted reply history, signatures and confidentiality footers (reply_trim.py) before the
+# classifier and the LLM prompt see a body. Set TRIM_REPLIES=0 to keep whole bodies.
+TRIM_REPLIES = os.environ.get("TRIM_REPLIES", "1") != "0"
+
+# Scorer behind check_subject_first: "rules" (the keyword weights) or "model", a hashed-feature logistic
+# regression learned from your own send/skip decisions (train with: python job_model.py; needs NumPy).
+# With "model", every Y/M/N decision also updates the model, saved to JOB_MODEL_FILE after each run.
+CLASSIFIER = os.environ.get("CLASSIFIER", "rules")
+JOB_MODEL_FILE = "job_model.npz"
+JOB_MODEL_HASH_BITS = 18  # 2^18 feature buckets
+JOB_MODEL_THRESHOLD = 0.5  # Job related when the predicted probability reaches this
+# The rules keep classifying until the model has learned from this many examples (history training counts each epoch)
+JOB_MODEL_MIN_EXAMPLES = int(os.environ.get("JOB_MODEL_MIN_EXAMPLES", "50"))
+
+# Near-duplicate detection (near_duplicates.py): one job description blasted by many recruiters is drafted
+# once, and copies of a job you skipped are skipped for good. Set NEAR_DUPLICATES=0 to draft every copy.
+NEAR_DUPLICATES = os.environ.get("NEAR_DUPLICATES", "1") != "0"
+NEAR_DUPLICATE_MAX_DISTANCE = 12  # SimHash bits (of 64) two bodies may differ in and still be the same job
+NEAR_DUPLICATE_MIN_WORDS = 40     # Shorter bodies are too small to fingerprint reliably
+NEAR_DUPLICATE_HISTORY_DAYS = 7   # Jobs are remembered this long after their last copy arrived
+
+# Header rule prefilter (header_rules.py): reason codes to turn off, comma separated,
+# e.g. "list-unsubscribe" if recruiters you want to hear from send through an ATS that adds it
+HEADER_RULES_DISABLED = [reason for reason in os.environ.get("HEADER_RULES_DISABLED", "").split(",") if reason]
+
+# Asyncio reader (python main.py --async): FETCH commands kept in flight at once on one connection
+ASYNC_PIPELINE_DEPTH = 4
+
+# Push mode (python main.py --idle): re-issue IDLE well inside the server's 29-minute limit
+IDLE_REFRESH_SECONDS = 9 * 60
+IDLE_POLL_SECONDS = 60             # Used when the server does not advertise IDLE
+IDLE_RECONNECT_MAX_SECONDS = 300   # Upper bound for the reconnect backoff
+
 # OpenAI API Key
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
@@ -16,6 +110,12 @@ RESUME_PATH = "Steven_McConnon_Resume.pdf"
 
 # File Paths for Caching and Tracking
 CONVERSATION_TRACKER = "recruiter_conversations.json"
-EMAIL_CACHE = "email_cache.json"
+EMAIL_CACHE = "email_cache"  # Raw message store (one gzip file per UID); "" disables it
+EMAIL_CACHE_MAX_MB = 500
+EMAIL_CACHE_MAX_AGE_DAYS = 60
 SKIPPED_EMAILS = "skipped_emails.json"
+IMAP_SYNC_STATE = "imap_sync_state.json"  # UIDVALIDITY + last seen UID per mailbox
+VERDICT_CACHE = "verdict_cache.json"  # Classifier verdicts by Message-ID/body hash and ruleset; "" disables it
+VERDICT_CACHE_MAX_ENTRIES = 20000
+NEAR_DUPLICATE_INDEX = "near_duplicates.json"  # Recent job clusters (near_duplicates.py)
 INTERVIEW_CSV = "upcoming_interviews.csv"
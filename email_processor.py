@@ -2,111 +2,1014 @@ import imaplib
 import email
 import datetime
 import time
-import sys
 import re
+import itertools
+import select
+import ssl
+import threading
+import heapq
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from email.parser import BytesHeaderParser
 from email.utils import parsedate_to_datetime
-from config import EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER
-from utils import load_json_file, save_json_file
+from config import (
+    EMAIL_ADDRESS, IMAP_SERVER, ACCOUNTS,
+    FETCH_WINDOW_DAYS, FETCH_WINDOW_HOURS, FETCH_SINCE, FETCH_BEFORE, FETCH_INCREMENTAL,
+    IMAP_SYNC_STATE, HEADER_BATCH_SIZE, FETCH_BATCH_BYTES, FETCH_BATCH_MAX_MESSAGES, BODY_FETCH_MAX_BYTES,
+    FETCH_CONNECTIONS, FETCH_MAX_CONNECTIONS, EMAIL_CACHE, KEYWORD_SKIPPED, IMAP_TIMEOUT_SECONDS, IDLE_REFRESH_SECONDS, IDLE_POLL_SECONDS, IDLE_RECONNECT_MAX_SECONDS,
+)
+from email_responder import check_subject_first
+from imap_session import ImapSession, MailboxChangedError, CONNECTION_ERRORS, compress_uid_set, parse_uid_set
+from message_cache import MessageCache
+from imap_keywords import (
+    session_mailbox, unkeyword_criteria, remember_location, message_location, mark_uids, flush_keywords,
+    archive_skipped,
+)
+from html_text import html_to_text, plain_to_text
+from parsed_email import ParsedEmail, decode_subject
+from header_rules import RULE_HEADERS, match_header_rules, rejections as header_rejections, report_rejections
+from bodystructure import find_bodystructure, select_text_part, build_text_message
+from utils import load_json_file, save_json_file, ProgressReporter
 
 SKIPPED_EMAILS = "skipped_emails.json"  # Store permanently skipped emails
+SENT_EMAILS = "sent_emails.json"  # Track sent emails to prevent duplicates
+MAX_INDEXED_MESSAGES = 5000  # Per-mailbox UID index kept for flag/expunge sync
+
+# IMAP dates are always English month abbreviations, regardless of locale
+IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Headers requested in the first (header-only) fetch pass: what the prefilter reads plus the header rules
+HEADER_FIELDS = ("FROM", "SUBJECT", "DATE", "MESSAGE-ID") + RULE_HEADERS
+HEADER_PARSER = BytesHeaderParser()
+PREFILTER_LOCK = threading.Lock()  # The skip list is shared by parallel fetch workers and mailboxes
+SYNC_STATE_LOCK = threading.Lock()  # Mailboxes scanned concurrently share one sync state file
+_deferred_this_run = {}  # state key -> UIDs deferred by this process, which a finishing scan must not forget
+# Charsets in which ASCII bytes mean ASCII text, so an all-ASCII payload needs no real decoding
+ASCII_COMPATIBLE_CHARSET_RE = re.compile(r"(?:us-)?ascii$|utf-?8$|iso-?8859-\d+$|latin-?\d$|(?:cp|windows-)125\d$",
+                                         re.IGNORECASE)
+IDLE_TAGS = itertools.count(1)  # Tags for hand-driven IDLE commands; imaplib's own tags look like ABCD12
+
+# Pieces of an imaplib FETCH response: b'12 (UID 34 RFC822.SIZE 5678 BODY[HEADER.FIELDS (FROM)] {90}'
+FETCH_START_RE = re.compile(rb"^(\d+) \(")
+FETCH_NUMERIC_RE = re.compile(rb"\b(UID|RFC822\.SIZE|MODSEQ) \(?(\d+)\)?", re.IGNORECASE)
+FETCH_FLAGS_RE = re.compile(rb"\bFLAGS \(([^)]*)\)", re.IGNORECASE)
+FETCH_LITERAL_RE = re.compile(rb"((?:BODY|BINARY|RFC822)(?:\.[A-Z]+)?(?:\[[^\]]*\])?(?:<\d+>)?) \{\d+\}$", re.IGNORECASE)
 
 def clean_html(raw_html):
     """Remove HTML tags and extract plain text from an email body."""
-    clean_text = re.sub(r'<.*?>', '', raw_html)  # Remove HTML tags
-    return clean_text.strip()
+    return html_to_text(raw_html)
 
 def extract_email_body(msg):
     """Extract plain text body from an email message, handling encoding errors and stripping HTML."""
-    body_text = ""
-    
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain" or part.get_content_type() == "text/html":
-                try:
-                    body_text = part.get_payload(decode=True).decode("utf-8", errors="replace")
-                except UnicodeDecodeError:
-                    body_text = part.get_payload(decode=True).decode("latin-1", errors="replace")
-                break  # Use first available text content
-    
+    body_text, is_html = email_body_text(msg)
+    return html_to_text(body_text) if is_html else plain_to_text(body_text)  # Always return cleaned text
+
+def email_body_text(msg):
+    """
+    The message's text payload, decoded but not cleaned: text/plain when the message has it (no HTML
+    stripping needed), else text/html. Returns (text, is_html); ("", False) when there is no text part.
+    """
+    part = select_body_part(msg)
+    if part is None:
+        return "", False
+    return decode_payload(part), part.get_content_subtype() == "html"
+
+def select_body_part(msg):
+    """The first inline text/plain part, else the first inline text/html part, else None (like select_text_part)."""
+    html_part = None
+    for part in msg.walk():
+        if part.get_content_maintype() != "text" or part.get_content_disposition() == "attachment":
+            continue
+        subtype = part.get_content_subtype()
+        if subtype == "plain":
+            return part
+        if subtype == "html" and html_part is None:
+            html_part = part
+    return html_part
+
+def decode_payload(part):
+    """
+    Decode a part's transfer-encoded payload once, then its bytes with the declared charset, falling
+    back to UTF-8, Windows-1252 and finally Latin-1 (which never fails) for mislabelled mail.
+    """
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ""
+    declared = part.get_content_charset()
+    # Most recruiter mail. 7-bit charsets such as ISO-2022-JP or UTF-7 are ASCII bytes too, but not ASCII text
+    if payload.isascii() and (declared is None or ASCII_COMPATIBLE_CHARSET_RE.match(declared)):
+        return payload.decode("ascii")
+    for charset in (declared, "utf-8", "cp1252"):
+        if not charset:
+            continue
+        try:
+            return payload.decode(charset)
+        except (LookupError, UnicodeDecodeError):  # Unknown charset name or mislabelled bytes
+            continue
+    return payload.decode("latin-1")
+
+def parsed_from_message(uid, survivor, msg):
+    """
+    Build the ParsedEmail record for a prefilter survivor (email_date, sender, subject) and its
+    fetched message. Survivors already passed check_subject_first, so that verdict is carried along.
+    """
+    email_date, sender, subject = survivor
+    body_text, is_html = email_body_text(msg)
+    return ParsedEmail(email_date, sender, subject, body_text, uid=uid, message_id=msg.get("Message-ID"),
+                       is_html=is_html, subject_is_job=True)
+
+def imap_date(value):
+    """Format a date as DD-Mon-YYYY for IMAP SEARCH (locale independent)."""
+    return f"{value.day:02d}-{IMAP_MONTHS[value.month - 1]}-{value.year}"
+
+def to_local_naive(value):
+    """Convert an aware datetime to naive local time; naive values pass through."""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+def _parse_window_bound(value):
+    """Accept None, a date, a datetime or an ISO string and return a naive datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return to_local_naive(value)
+
+def compute_fetch_window(days=None, hours=None, since=None, before=None):
+    """
+    Return the (start, end) datetimes of the fetch window.
+    An explicit since/before wins; otherwise the window is the last days/hours before `before` (or now).
+    """
+    since = FETCH_SINCE if since is None else since
+    before = FETCH_BEFORE if before is None else before
+
+    end = _parse_window_bound(before) or datetime.datetime.now()
+    start = _parse_window_bound(since)
+    if start is None:
+        days = FETCH_WINDOW_DAYS if days is None else days
+        hours = FETCH_WINDOW_HOURS if hours is None else hours
+        start = end - datetime.timedelta(days=days, hours=hours)
+
+    if start >= end:
+        raise ValueError(f"Empty fetch window: {start} is not before {end}")
+    return start, end
+
+def build_search_criteria(start, end):
+    """
+    Build IMAP SEARCH criteria covering [start, end).
+    SINCE/BEFORE are date-granular and compare against the server's INTERNALDATE,
+    so the range is padded by a day on each side; the exact window is enforced on
+    the Date header after the fetch.
+    """
+    since_date = start.date() - datetime.timedelta(days=1)
+    before_date = end.date() + datetime.timedelta(days=2)
+    return ["SINCE", imap_date(since_date), "BEFORE", imap_date(before_date)]
+
+def mailbox_state_key(folder="inbox", server=None, address=None):
+    """Key used for a mailbox in the sync state file."""
+    return f"{address or EMAIL_ADDRESS}@{server or IMAP_SERVER}/{folder}"
+
+def open_mailbox(folder="inbox", account=None):
+    """
+    Connect, log in and SELECT folder (of `account`, a dict from config.ACCOUNTS; the primary account by default).
+    Returns an ImapSession, or None if the folder could not be opened.
+    """
+    account = account or {}
+    session = ImapSession(folder, account.get("imap_server"), account.get("address"), account.get("password"))
+    print(f"📩 Connecting to {session.server} as {session.address}...")
+    print(f"📥 Selecting {folder}...")
+    try:
+        session.call("noop")  # Connects and selects, with the usual retries
+    except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+        print(f"❌ Error: Could not select {folder} ({e}).")
+        session.close()
+        return None
+    return session
+
+def incremental_search_criteria(criteria, mailbox_state, select_info, incremental=True):
+    """
+    Narrow the window criteria using the stored sync state. Returns (criteria, last_uid), or None when
+    UIDNEXT shows nothing new arrived. When UIDVALIDITY matches the stored state only UIDs above the
+    stored high-water mark, plus the deferred ones below it (skipped "for now", see defer_message), are
+    searched; a changed UIDVALIDITY (or no state yet) means a full resync.
+    """
+    uidvalidity = select_info.get("uidvalidity")
+    uidnext = select_info.get("uidnext")
+    last_uid = mailbox_state.get("last_uid", 0)
+    deferred = mailbox_state.get("deferred", [])
+
+    if incremental and uidvalidity is not None and mailbox_state.get("uidvalidity") == uidvalidity and last_uid:
+        if uidnext is not None and uidnext <= last_uid + 1 and not deferred:
+            print("✅ No new mail since the last run.")
+            return None
+        print(f"🔁 Incremental sync: searching UIDs above {last_uid}" +
+              (f" and {len(deferred)} deferred..." if deferred else "..."))
+        uid_set = f"{compress_uid_set(deferred)},{last_uid + 1}:*" if deferred else f"{last_uid + 1}:*"
+        return ["UID", uid_set] + criteria, last_uid
+    if mailbox_state.get("uidvalidity") not in (None, uidvalidity):
+        print("♻️ UIDVALIDITY changed; running a full resync of the window.")
+    return criteria, 0
+
+def next_high_water_mark(mailbox_state, uidvalidity, email_ids):
+    """The last_uid to store after a scan: deferred UIDs below the old mark must not move it back."""
+    previous = mailbox_state.get("last_uid", 0) if mailbox_state.get("uidvalidity") == uidvalidity else 0
+    return max([previous, *email_ids])
+
+def parse_search_uids(search_data, last_uid=0, deferred=()):
+    """UIDs from a UID SEARCH response, newest first, excluding those at or below last_uid unless deferred."""
+    uids = [int(uid) for uid in (search_data[0] or b"").split()]
+    deferred = set(deferred)
+    uids = [uid for uid in uids if uid > last_uid or uid in deferred]  # "n:*" always matches the highest UID
+    uids.sort(reverse=True)  # Newest emails first
+    return uids
+
+def search_candidate_uids(session, criteria, mailbox_state, incremental=True):
+    """Return the candidate UIDs (newest first) for the selected mailbox, searching incrementally when possible."""
+    narrowed = incremental_search_criteria(criteria, mailbox_state, session.select_info, incremental)
+    if narrowed is None:
+        return []
+    criteria, last_uid = narrowed
+    _, search_data = session.uid("SEARCH", None, *criteria)
+    return parse_search_uids(search_data, last_uid, mailbox_state.get("deferred", ()))
+
+def save_mailbox_state(state_key, updates, indexed=None, removed=(), undeferred=()):
+    """
+    Merge updates into one mailbox's sync state entry. `indexed` adds {uid: [email_id, sender, date]}
+    entries to the UID index used for flag/expunge sync; `removed` drops UIDs from it. `undeferred`
+    drops deferred UIDs that a scan fetched again, unless they were deferred again meanwhile.
+    """
+    with SYNC_STATE_LOCK:  # Re-read so concurrent mailboxes don't overwrite each other's marks
+        sync_state = load_json_file(IMAP_SYNC_STATE)
+        entry = sync_state.get(state_key, {})
+        if "uidvalidity" in updates and entry.get("uidvalidity") != updates["uidvalidity"]:
+            entry = {}  # UIDs from an older UIDVALIDITY are meaningless
+        entry.update(updates)
+        if undeferred and entry.get("deferred"):
+            done = set(undeferred) - _deferred_this_run.get(state_key, set())
+            entry["deferred"] = [uid for uid in entry["deferred"] if uid not in done]
+
+        index = entry.get("messages", {})
+        for uid in removed:
+            index.pop(str(uid), None)
+        for uid, info in (indexed or {}).items():
+            index[str(uid)] = info
+        if len(index) > MAX_INDEXED_MESSAGES:
+            newest = sorted(index, key=int, reverse=True)[:MAX_INDEXED_MESSAGES]
+            index = {uid: index[uid] for uid in newest}
+        entry["messages"] = index
+
+        sync_state[state_key] = entry
+        save_json_file(IMAP_SYNC_STATE, sync_state)
+
+def defer_message(email_id):
+    """
+    Keep a message skipped "for now" (S) in its mailbox's sync state, so later incremental runs fetch it
+    again although it is below the high-water mark. Unknown ids (e.g. offline replays) are ignored.
+    """
+    location = message_location(email_id)
+    if location is None:
+        return
+    (server, address, folder), uid = location
+    state_key = mailbox_state_key(folder, server, address)
+    with SYNC_STATE_LOCK:
+        _deferred_this_run.setdefault(state_key, set()).add(uid)
+        sync_state = load_json_file(IMAP_SYNC_STATE)
+        entry = sync_state.setdefault(state_key, {})
+        entry["deferred"] = sorted(set(entry.get("deferred", [])) | {uid})
+        save_json_file(IMAP_SYNC_STATE, sync_state)
+
+def sync_flag_changes(session, mailbox_state, state_key):
+    """
+    Bring local state in line with changes made elsewhere since the last run, using CONDSTORE/QRESYNC.
+    Only flag changes newer than the stored HIGHESTMODSEQ are fetched, restricted to UIDs we've indexed;
+    with QRESYNC the same round trip reports expunged (VANISHED) UIDs, otherwise a UID SEARCH over the
+    indexed set finds them. Effects:
+      - vanished or \\Deleted messages leave the UID index and their "<date> - <sender>" skip entry
+      - messages marked \\Answered by another client count as replied in sent_emails.json
+    """
+    info = session.select_info
+    modseq = info.get("highestmodseq")
+    if modseq is None:
+        return
+    info["highestmodseq"] = None  # Only valid right after SELECT, like UIDNEXT
+
+    index = mailbox_state.get("messages", {})
+    last_modseq = mailbox_state.get("highestmodseq")
+    if mailbox_state.get("uidvalidity") != info.get("uidvalidity") or not index or not last_modseq:
+        save_mailbox_state(state_key, {"uidvalidity": info.get("uidvalidity"), "highestmodseq": modseq})
+        return
+    if modseq == last_modseq:
+        return  # Nothing changed anywhere in the mailbox
+
+    uid_set = compress_uid_set(int(uid) for uid in index)
+    modifiers = f"(CHANGEDSINCE {last_modseq} VANISHED)" if info.get("qresync") else f"(CHANGEDSINCE {last_modseq})"
+    _, data = session.uid("FETCH", uid_set, "(UID FLAGS)", modifiers)
+    changed = {item["UID"]: item.get("FLAGS", ()) for item in parse_fetch_response(data or []) if "UID" in item}
+
+    vanished = set()
+    if info.get("qresync"):
+        _, vanished_data = session.mail.response("VANISHED")
+        for line in vanished_data or []:
+            if line:
+                vanished |= parse_uid_set(line.decode().replace("(EARLIER)", "").strip())
     else:
+        _, search_data = session.uid("SEARCH", None, "UID", uid_set)
+        existing = {int(uid) for uid in (search_data[0] or b"").split()}
+        vanished = {int(uid) for uid in index} - existing
+
+    vanished |= {uid for uid, flags in changed.items() if "\\Deleted" in flags}
+    answered = [uid for uid, flags in changed.items() if "\\Answered" in flags and uid not in vanished]
+
+    with PREFILTER_LOCK:
+        if vanished:
+            skipped_emails = load_json_file(SKIPPED_EMAILS)
+            for uid in vanished:
+                email_id = (index.get(str(uid)) or [None])[0]
+                skipped_emails.pop(email_id, None)
+            save_json_file(SKIPPED_EMAILS, skipped_emails)
+        if answered:
+            sent_emails = load_json_file(SENT_EMAILS)
+            for uid in answered:
+                _, sender, email_date = index[str(uid)]
+                if sent_emails.get(sender, "") < email_date:
+                    sent_emails[sender] = email_date
+            save_json_file(SENT_EMAILS, sent_emails)
+
+    save_mailbox_state(state_key, {"highestmodseq": modseq}, removed=vanished)
+    print(f"🔄 Flag sync: {len(changed)} changed, {len(vanished)} vanished, {len(answered)} answered elsewhere.")
+
+def parse_fetch_response(msg_data):
+    """
+    Group an imaplib FETCH response into one dict per message.
+    Numeric attributes (UID, RFC822.SIZE, MODSEQ) become ints and every literal is stored
+    under its upper-cased item name, e.g. {"SEQ": b"12", "UID": 34, "BODY[HEADER.FIELDS (FROM)]": b"..."}.
+    """
+    messages = []
+    current = None
+
+    for part in msg_data:
+        if isinstance(part, tuple):
+            meta, literal = part
+            seq_match = FETCH_START_RE.match(meta)
+            if seq_match or current is None:
+                current = {"SEQ": seq_match.group(1) if seq_match else None}
+                messages.append(current)
+            _parse_fetch_attributes(meta, current)
+            name_match = FETCH_LITERAL_RE.search(meta)
+            if name_match:
+                current[name_match.group(1).upper().decode()] = literal
+        elif isinstance(part, bytes):
+            seq_match = FETCH_START_RE.match(part)
+            if seq_match:  # Message without any literal (e.g. UID/FLAGS only)
+                current = {"SEQ": seq_match.group(1)}
+                messages.append(current)
+            if current is not None:
+                _parse_fetch_attributes(part, current)
+            current = None  # A bare bytes entry always closes the message
+
+    return messages
+
+def _parse_fetch_attributes(meta, item):
+    """Copy the numeric attributes (and a parsed BODYSTRUCTURE) found in a FETCH response fragment into item."""
+    for name, value in FETCH_NUMERIC_RE.findall(meta):
+        item[name.decode().upper()] = int(value)
+    flags_match = FETCH_FLAGS_RE.search(meta)
+    if flags_match:
+        item["FLAGS"] = tuple(flags_match.group(1).decode(errors="replace").split())
+    structure = find_bodystructure(meta)
+    if structure is not None:
+        item["BODYSTRUCTURE"] = structure
+
+def find_fetch_literal(item, prefix):
+    """
+    Return the first literal in a parsed FETCH item whose name starts with prefix: bytes, or a Message
+    when the literal was streamed into a parser as it arrived (see async_imap).
+    """
+    for key, value in item.items():
+        if key.startswith(prefix) and isinstance(value, (bytes, Message)):
+            return value
+    return None
+
+def _prefilter_headers(headers, start_date, end_date, skipped_emails, on_permanent_skip=None):
+    """
+    Header-only first pass: decide from From/Subject/Date alone whether the body is worth downloading.
+    Returns (email_date, sender, subject) for survivors, or None. Mail skipped for good (noreply senders)
+    is added to the in-memory skipped_emails and reported through `on_permanent_skip(skip_key)`; callers
+    persist a whole batch of those with save_new_skips.
+    """
+    sender = headers["From"] or ""
+    subject = headers["Subject"] or ""
+
+    if "Date" not in headers:
+        return None
+    try:
+        email_date = to_local_naive(parsedate_to_datetime(headers["Date"]))
+    except Exception:
+        print(f"\n⚠️ Could not parse date for email from {sender}. Skipping.")
+        return None
+
+    if email_date >= end_date or email_date < start_date:
+        return None
+
+    # **Automatically skip "noreply" emails and mark them as permanently skipped**
+    if "noreply" in sender.lower():
+        print(f"🚫 Skipping permanently: 'noreply' email from {sender}.")
+        skipped_emails[f"{subject} - {sender}"] = True  # Mark as skipped
+        if on_permanent_skip is not None:
+            on_permanent_skip(f"{subject} - {sender}")
+        return None
+
+    # Already decided in an earlier run (keys written here and by main.process_recruiter_emails)
+    if f"{subject} - {sender}" in skipped_emails or f"{email_date} - {sender}" in skipped_emails:
+        return None
+
+    # Mailing lists, bulk senders and autoresponders (header_rules); counted per reason for the scan summary
+    reason = match_header_rules(headers)
+    if reason is not None:
+        header_rejections[reason] += 1
+        return None
+
+    # Same subject-only check main applies, so rejecting here never drops a mail main would keep
+    if not check_subject_first(decode_subject(subject)):
+        return None
+
+    return email_date, sender, subject
+
+def plan_byte_batches(uids, sizes, byte_budget=FETCH_BATCH_BYTES, max_count=FETCH_BATCH_MAX_MESSAGES):
+    """
+    Split uids (order preserved) into batches whose summed RFC822.SIZE stays within byte_budget.
+    A message larger than the budget gets a batch of its own; unknown sizes count as zero.
+    """
+    batches = []
+    batch, batch_bytes = [], 0
+    for uid in uids:
+        size = sizes.get(uid) or 0
+        if batch and (batch_bytes + size > byte_budget or len(batch) >= max_count):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(uid)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+def header_fetch_query():
+    """FETCH items for phase 1: size, structure and only the headers the prefilter needs."""
+    return f"(RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({' '.join(HEADER_FIELDS)})])"
+
+def save_new_skips(skip_keys):
+    """
+    Add permanently skipped keys to skipped_emails.json in one write. The file is re-read first so
+    decisions main saved since this scan loaded its copy are kept.
+    """
+    skip_keys = list(skip_keys)
+    if not skip_keys:
+        return
+    with PREFILTER_LOCK:
+        skipped_emails = load_json_file(SKIPPED_EMAILS)
+        skipped_emails.update(dict.fromkeys(skip_keys, True))
+        save_json_file(SKIPPED_EMAILS, skipped_emails)
+
+def collect_header_candidates(items, start_date, end_date, skipped_emails, auto_skipped=None):
+    """
+    Run the prefilter over parsed phase-1 FETCH items.
+    Returns ({uid: (email_date, sender, subject)}, {uid: bytes to download}, {uid: (header_bytes, structure)})
+    for the survivors. The download size is the capped text part when the structure is known.
+    UIDs skipped for good are appended to `auto_skipped` when given.
+    """
+    candidates, sizes, plans = {}, {}, {}
+    newly_skipped = []  # (uid, skip key)
+    for item in items:
+        header_bytes = find_fetch_literal(item, "BODY[HEADER")
+        if header_bytes is None:
+            continue
+        uid = item.get("UID")
+        headers = HEADER_PARSER.parsebytes(header_bytes)
+        with PREFILTER_LOCK:
+            survivor = _prefilter_headers(headers, start_date, end_date, skipped_emails,
+                                          lambda key: newly_skipped.append((uid, key)))
+        if survivor is None:
+            continue
+
+        structure = item.get("BODYSTRUCTURE")
+        candidates[uid] = survivor
+        plans[uid] = (header_bytes, structure)
+        if structure is not None:
+            text_part = select_text_part(structure)
+            sizes[uid] = min(text_part.size, BODY_FETCH_MAX_BYTES) if text_part else 0
+        else:
+            sizes[uid] = item.get("RFC822.SIZE")
+
+    save_new_skips(key for _, key in newly_skipped)
+    if auto_skipped is not None:
+        auto_skipped.extend(uid for uid, _ in newly_skipped)
+    return candidates, sizes, plans
+
+def fetch_header_candidates(session, batch, start_date, end_date, skipped_emails):
+    """
+    Phase 1: fetch RFC822.SIZE, BODYSTRUCTURE and the prefilter headers for a batch of UIDs and prefilter them.
+    Mail skipped for good is queued for the KEYWORD_SKIPPED keyword.
+    """
+    _, header_data = session.uid("FETCH", ",".join(map(str, batch)), header_fetch_query())
+    auto_skipped = []
+    result = collect_header_candidates(parse_fetch_response(header_data), start_date, end_date, skipped_emails,
+                                       auto_skipped)
+    mark_uids(session_mailbox(session), auto_skipped, KEYWORD_SKIPPED)
+    return result
+
+def fetch_raw_messages(session, uids):
+    """Fetch full messages without setting \\Seen. Returns {uid: raw bytes}."""
+    _, body_data = session.uid("FETCH", ",".join(map(str, uids)), "(BODY.PEEK[])")
+    return {item.get("UID"): find_fetch_literal(item, "BODY[]") for item in parse_fetch_response(body_data)}
+
+def plan_body_fetches(uids, plans):
+    """
+    Decide how to download each message's readable text, guided by its BODYSTRUCTURE.
+    Returns ({uid: raw bytes} needing no download, [uids needing a full fetch], {section: [(uid, text_part)]}).
+    """
+    bodies, full_fetch, by_section = {}, [], {}
+    for uid in uids:
+        header_bytes, structure = plans.get(uid, (None, None))
+        if structure is None or header_bytes is None:
+            full_fetch.append(uid)
+            continue
+        text_part = select_text_part(structure)
+        if text_part is None:  # Nothing readable (e.g. attachments only)
+            bodies[uid] = build_text_message(header_bytes, None, b"")
+            continue
+        by_section.setdefault(text_part.section, []).append((uid, text_part))
+    return bodies, full_fetch, by_section
+
+def section_fetch_query(section):
+    """FETCH items for phase 2: the first BODY_FETCH_MAX_BYTES of one body section, without setting \\Seen."""
+    return f"(BODY.PEEK[{section}]<0.{BODY_FETCH_MAX_BYTES}>)"
+
+def fetch_message_bodies(session, uids, plans):
+    """
+    Phase 2: download only the readable text of each message, guided by its BODYSTRUCTURE.
+    The chosen section is fetched as BODY.PEEK[n]<0.BODY_FETCH_MAX_BYTES> (one FETCH per distinct section)
+    and wrapped with the prefetched headers via build_text_message, so attachments are never transferred.
+    Messages without a usable BODYSTRUCTURE fall back to a full fetch. Returns {uid: raw bytes}.
+    """
+    bodies, full_fetch, by_section = plan_body_fetches(uids, plans)
+    for section, entries in by_section.items():
+        _, data = session.uid("FETCH", ",".join(str(uid) for uid, _ in entries), section_fetch_query(section))
+        fetched = {item.get("UID"): find_fetch_literal(item, f"BODY[{section}]") for item in parse_fetch_response(data)}
+        del data  # Only the literals are still needed, and each goes once it has been wrapped
+        for uid, text_part in entries:
+            if uid in fetched:
+                bodies[uid] = build_text_message(plans[uid][0], text_part, fetched.pop(uid))
+
+    if full_fetch:
+        bodies.update(fetch_raw_messages(session, full_fetch))
+    return bodies
+
+def _prefilter_cached(cached, start_date, end_date, skipped_emails, auto_skipped=None):
+    """Run the header prefilter on cached raw messages. Returns {uid: (email_date, sender, subject)}."""
+    candidates = {}
+    newly_skipped = []  # (uid, skip key)
+    for uid, raw_message in cached.items():
+        headers = HEADER_PARSER.parsebytes(raw_message)
+        with PREFILTER_LOCK:
+            survivor = _prefilter_headers(headers, start_date, end_date, skipped_emails,
+                                          lambda key: newly_skipped.append((uid, key)))
+        if survivor is not None:
+            candidates[uid] = survivor
+
+    save_new_skips(key for _, key in newly_skipped)
+    if auto_skipped is not None:
+        auto_skipped.extend(uid for uid, _ in newly_skipped)
+    return candidates
+
+def iter_chunk_messages(session, chunk, start_date, end_date, skipped_emails, cache=None):
+    """
+    Two-phase fetch of one chunk of UIDs (newest first): headers and BODYSTRUCTURE for the whole chunk,
+    then just the text part of each survivor, packed by size. Yields a ParsedEmail per survivor.
+    Each raw message is parsed down to its body text as soon as its batch arrives and released right
+    after, so callers that buffer a chunk (the parallel fetcher) only hold text.
+    Messages already in the MessageCache are prefiltered and served locally without any network I/O;
+    fetched bodies are added to it.
+    Batches that still fail after the session's retries are counted in session.dropped and skipped;
+    MailboxChangedError propagates since the remaining UIDs are meaningless.
+    """
+    mailbox_key = mailbox_state_key(session.folder, session.server, session.address)
+    uidvalidity = session.select_info.get("uidvalidity")
+    cached = {}
+    if cache is not None and uidvalidity is not None:
+        for uid in chunk:
+            raw_message = cache.get(mailbox_key, uidvalidity, uid)
+            if raw_message is not None:
+                cached[uid] = raw_message
+
+    auto_skipped = []
+    candidates = _prefilter_cached(cached, start_date, end_date, skipped_emails, auto_skipped)
+    mark_uids(session_mailbox(session), auto_skipped, KEYWORD_SKIPPED)
+    sizes, plans = {}, {}
+    to_fetch = [uid for uid in chunk if uid not in cached]
+    if to_fetch:
+        try:
+            fetched, sizes, plans = fetch_header_candidates(session, to_fetch, start_date, end_date, skipped_emails)
+        except MailboxChangedError:
+            raise
+        except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+            print(f"\n⚠️ Giving up on batch after {session.max_retries} retries: {e}")
+            session.record_drop(len(to_fetch))
+            fetched = {}
+        candidates.update(fetched)
+
+    wanted = [uid for uid in chunk if uid in candidates]  # Keep newest-first order
+    for body_batch in plan_byte_batches(wanted, sizes):
+        bodies = {uid: cached.pop(uid) for uid in body_batch if uid in cached}
+        missing = [uid for uid in body_batch if uid not in bodies]
+        if missing:
+            try:
+                fetched_bodies = fetch_message_bodies(session, missing, plans)
+            except MailboxChangedError:
+                raise
+            except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+                print(f"\n⚠️ Giving up on batch bodies after {session.max_retries} retries: {e}")
+                session.record_drop(len(missing))
+                fetched_bodies = {}
+            for uid, raw_message in fetched_bodies.items():
+                if raw_message is not None and cache is not None and uidvalidity is not None:
+                    try:
+                        cache.put(mailbox_key, uidvalidity, uid, raw_message)
+                    except OSError as e:  # Disk full or unwritable: the message is still processed
+                        print(f"\n⚠️ Could not cache message {uid}: {e}")
+            bodies.update(fetched_bodies)
+
+        for uid in body_batch:
+            raw_message = bodies.pop(uid, None)
+            if raw_message is not None:
+                yield parsed_from_message(uid, candidates[uid], email.message_from_bytes(raw_message))
+
+def _iter_serial(session, chunks, start_date, end_date, skipped_emails, progress, cache=None):
+    """Fetch chunks one after another on the scan's own connection."""
+    done = 0
+    for chunk in chunks:
+        yield from iter_chunk_messages(session, chunk, start_date, end_date, skipped_emails, cache)
+        done += len(chunk)
+        progress.update(done, force=done == progress.total)
+
+def _iter_parallel(session, chunks, connections, start_date, end_date, skipped_emails, progress, cache=None):
+    """
+    Fetch chunks over `connections` extra authenticated sessions in a thread pool.
+    Chunks are consumed in submission order, so messages still come out newest-first; at most
+    two chunks per connection are in flight to bound memory. Worker retry/drop counts are folded
+    back into `session` at the end; a chunk whose worker cannot connect is counted as dropped.
+    """
+    local = threading.local()
+    workers = []
+    workers_lock = threading.Lock()
+
+    def worker_session():
+        if getattr(local, "session", None) is None:
+            worker = ImapSession(session.folder, session.server, session.address, session.password)
+            with workers_lock:
+                workers.append(worker)
+            worker.call("noop")  # Connect + SELECT
+            if worker.select_info.get("uidvalidity") != session.select_info.get("uidvalidity"):
+                raise MailboxChangedError(f"UIDVALIDITY of {session.folder} changed during the scan")
+            local.session = worker
+        return local.session
+
+    def run_chunk(chunk):
         try:
-            body_text = msg.get_payload(decode=True).decode("utf-8", errors="replace")
-        except UnicodeDecodeError:
-            body_text = msg.get_payload(decode=True).decode("latin-1", errors="replace")
-
-    return clean_html(body_text)  # Always return cleaned text
-
-def fetch_recent_recruiter_emails():
-    """Fetch all emails from the last 4 days, ensuring job-related emails are processed immediately."""
-    print("📩 Connecting to Yahoo Mail...")
-    mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-    mail.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-
-    print("📥 Selecting inbox...")
-    status, messages = mail.select("inbox")
-    if status != "OK":
-        print("❌ Error: Could not select inbox.")
+            worker = worker_session()
+        except MailboxChangedError:
+            raise
+        except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+            # The next chunk on this thread tries to connect again
+            print(f"\n⚠️ Could not open a parallel connection, dropping {len(chunk)} messages: {e}")
+            with workers_lock:
+                session.record_drop(len(chunk))
+            return []
+        return list(iter_chunk_messages(worker, chunk, start_date, end_date, skipped_emails, cache))
+
+    print(f"🧵 Fetching over {connections} parallel connections...")
+    pool = ThreadPoolExecutor(max_workers=connections)
+    pending = deque()
+    remaining = iter(chunks)
+    done = 0
+    try:
+        for chunk in remaining:
+            pending.append((len(chunk), pool.submit(run_chunk, chunk)))
+            if len(pending) >= connections * 2:
+                break
+        while pending:
+            chunk_len, future = pending.popleft()
+            messages = future.result()
+            next_chunk = next(remaining, None)
+            if next_chunk is not None:
+                pending.append((len(next_chunk), pool.submit(run_chunk, next_chunk)))
+            done += chunk_len
+            progress.update(done, force=done == progress.total)
+            yield from messages
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for worker in workers:
+            session.retries += worker.retries
+            session.reconnects += worker.reconnects
+            session.dropped += worker.dropped
+            worker.close()
+
+def fetch_recent_recruiter_emails(days=None, hours=None, since=None, before=None, incremental=None, connections=None):
+    """
+    Fetch emails inside the configured time window, ensuring job-related emails are processed immediately.
+    The window is pushed down into IMAP SEARCH SINCE/BEFORE so only candidate messages are downloaded.
+    `connections` > 1 splits the fetch across that many connections (capped at FETCH_MAX_CONNECTIONS).
+    """
+    session = open_mailbox("inbox")
+    if session is None:
         return []
 
-    print("🔍 Searching for all emails from the last 4 days...")
-    _, search_data = mail.search(None, "ALL")  
-    email_ids = list(reversed(search_data[0].split()))  # Reverse to process newest emails first
+    try:
+        yield from scan_mailbox(session, days, hours, since, before, incremental, connections)
+    finally:
+        session.close()
+
+def scan_mailbox(session, days=None, hours=None, since=None, before=None, incremental=None, connections=None,
+                 skipped_emails=None):
+    """
+    Yield a ParsedEmail (unpacks as email_date, sender, subject, body) for recruiter candidates in an ImapSession's mailbox.
+    Each chunk is fetched in two phases: headers (plus RFC822.SIZE) first, then full bodies only for the
+    messages that survive the noreply filter, the skip list and check_subject_first (iter_chunk_messages).
+    Messages are addressed by UID and only UIDs above the last run's high-water mark are fetched
+    (see search_candidate_uids); the mark is persisted once the whole window has been processed.
+    Failed batches are retried by the session; a batch is only dropped once its retries are exhausted.
+    Pass `skipped_emails` to share one skip list between mailboxes scanned concurrently.
+    """
+    start_date, end_date = compute_fetch_window(days, hours, since, before)
+    incremental = FETCH_INCREMENTAL if incremental is None else incremental
+    connections = FETCH_CONNECTIONS if connections is None else connections
+
+    criteria = build_search_criteria(start_date, end_date)
+    criteria += unkeyword_criteria(session.select_info.get("permanentflags", ()))  # Skip mail already handled
+    print(f"🔍 Searching for emails from {start_date:%Y-%m-%d %H:%M} to {end_date:%Y-%m-%d %H:%M} ({' '.join(criteria)})...")
+    state_key = mailbox_state_key(session.folder, session.server, session.address)
+    mailbox_state = load_json_file(IMAP_SYNC_STATE).get(state_key, {})
+    try:
+        sync_flag_changes(session, mailbox_state, state_key)
+    except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+        print(f"⚠️ Flag sync skipped: {e}")
+    email_ids = search_candidate_uids(session, criteria, mailbox_state, incremental)
+    session.select_info["uidnext"] = None  # Only valid right after SELECT; later scans in this session must search
     print(f"📨 Found {len(email_ids)} emails.")
 
     if not email_ids:
         print("✅ No emails to process.")
         return []
 
-    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    cutoff_date = today - datetime.timedelta(days=4)
-
-    skipped_emails = load_json_file(SKIPPED_EMAILS)  # Load skipped emails list
+    if skipped_emails is None:
+        skipped_emails = load_json_file(SKIPPED_EMAILS)  # Load skipped emails list
 
     print("📡 Fetching email headers (real-time processing, batching newest first)...")
 
-    batch_size = 20  
-    total_emails = len(email_ids)
-    
-    for start in range(0, total_emails, batch_size):
-        batch = email_ids[start:start + batch_size]  
-        print(f"📡 Processing batch {start + 1}-{min(start + batch_size, total_emails)} of {total_emails}... ", end="")
-        sys.stdout.flush()
+    chunks = [email_ids[i:i + HEADER_BATCH_SIZE] for i in range(0, len(email_ids), HEADER_BATCH_SIZE)]
+    connections = max(1, min(connections, FETCH_MAX_CONNECTIONS, len(chunks)))
+    progress = ProgressReporter(len(email_ids), "📡 Scanned headers:")
+    dropped_before = session.dropped
+    cache = MessageCache() if EMAIL_CACHE else None
+
+    if connections > 1:
+        messages = _iter_parallel(session, chunks, connections, start_date, end_date, skipped_emails, progress, cache)
+    else:
+        messages = _iter_serial(session, chunks, start_date, end_date, skipped_emails, progress, cache)
+
+    indexed = {}
+    try:
+        for parsed in messages:
+            uid, email_date, sender, subject = parsed.uid, parsed.email_date, parsed.sender, parsed.subject
+            indexed[uid] = [f"{email_date} - {sender}", sender, email_date.strftime('%Y-%m-%d %H:%M:%S')]
+            remember_location(f"{email_date} - {sender}", session_mailbox(session), uid)
+
+            print(f"\n📖 Processing Job Email: {email_date.strftime('%Y-%m-%d %H:%M:%S')} - {subject} (From: {sender})")
+            yield parsed  # Process job email immediately
+            flush_keywords(session)  # Decisions made on the previous emails
+    except MailboxChangedError as e:
+        print(f"\n♻️ {e}; stopping this scan so the next one resyncs.")
+        return
+    finally:
+        messages.close()
+
+    flush_keywords(session)
+    archive_skipped(session)  # One batched MOVE for everything skipped for good during this scan
+    rejected = report_rejections()
+    if rejected:
+        print(f"🧹 Header rules rejected {rejected}.")
+    if session.retries or session.dropped:
+        print(f"📊 IMAP session: {session.report()}")
+    if cache is not None:
+        evicted = cache.evict()
+        print(f"🗄️ Message cache: {cache.report()} evicted={evicted}")
 
+    # Only advance the high-water mark (and forget the deferred UIDs fetched again) when every batch made it through
+    if session.select_info.get("uidvalidity") is not None:
+        updates = {"uidvalidity": session.select_info["uidvalidity"]}
+        undeferred = ()
+        if session.dropped == dropped_before:
+            updates["last_uid"] = next_high_water_mark(mailbox_state, updates["uidvalidity"], email_ids)
+            undeferred = mailbox_state.get("deferred", ())
+        save_mailbox_state(state_key, updates, indexed, undeferred=undeferred)
+
+def _mailbox_worker(account, folder, out_queue, stop, skipped_emails, scan_args):
+    """Producer thread for fetch_all_mailboxes: scan one mailbox into out_queue, then post a None sentinel."""
+    session = None
+    messages = None
+    try:
+        session = open_mailbox(folder, account)
+        if session is None:
+            return
+        messages = scan_mailbox(session, *scan_args, skipped_emails=skipped_emails)
+        for item in messages:
+            while not stop.is_set():
+                try:
+                    out_queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+    except Exception as e:
+        print(f"\n❌ Error scanning {folder} of {(account or {}).get('address')}: {e}")
+    finally:
+        if messages is not None:
+            messages.close()
+        if session is not None:
+            session.close()
+        out_queue.put(None)
+
+def _drain_queue(in_queue):
+    """Iterate a producer queue until its None sentinel."""
+    while True:
+        item = in_queue.get()
+        if item is None:
+            return
+        yield item
+
+def fetch_all_mailboxes(accounts=None, days=None, hours=None, since=None, before=None, incremental=None,
+                        connections=None):
+    """
+    Scan every folder of every configured account concurrently (one producer thread per mailbox, each
+    with its own connection and incremental state) and interleave the results into one stream of
+    ParsedEmail records. The skip list is shared across all mailboxes.
+    The order is only roughly newest first: each mailbox yields by descending UID, and Date headers
+    don't always follow UID order, so the merge by date is best effort rather than a global sort.
+    """
+    accounts = ACCOUNTS if accounts is None else accounts
+    mailboxes = [(account, folder) for account in accounts for folder in account.get("folders", ["inbox"])]
+    scan_args = (days, hours, since, before, incremental, connections)
+    skipped_emails = load_json_file(SKIPPED_EMAILS)
+
+    if len(mailboxes) == 1:
+        account, folder = mailboxes[0]
+        session = open_mailbox(folder, account)
+        if session is None:
+            return []
         try:
-            _, msg_data = mail.fetch(",".join(e_id.decode() for e_id in batch), "(RFC822)")  
-        except imaplib.IMAP4.error:
-            print("\n⚠️ IMAP error while fetching emails. Retrying after 10 seconds...")
-            time.sleep(10)
-            continue  
-
-        for response_part in msg_data:
-            if isinstance(response_part, tuple):
-                msg = email.message_from_bytes(response_part[1])
-                sender = msg["From"]
-                subject = msg["Subject"]
-                body = extract_email_body(msg)  # Now always returning clean text
-
-                if "Date" in msg:
-                    try:
-                        email_date = parsedate_to_datetime(msg["Date"]).replace(tzinfo=None)
-                    except Exception:
-                        print(f"\n⚠️ Could not parse date for email from {sender}. Skipping.")
-                        continue
-
-                    if email_date > today or email_date < cutoff_date:
-                        continue  
-
-                    # **Automatically skip "noreply" emails and mark them as permanently skipped**
-                    if "noreply" in sender.lower():
-                        print(f"🚫 Skipping permanently: 'noreply' email from {sender}.")
-                        skipped_emails[f"{subject} - {sender}"] = True  # Mark as skipped
-                        save_json_file(SKIPPED_EMAILS, skipped_emails)
-                        continue
-
-                    print(f"\n📖 Processing Job Email: {email_date.strftime('%Y-%m-%d %H:%M:%S')} - {subject} (From: {sender})")
-                    yield email_date, sender, subject, body  # Process job email immediately
-
-        for _ in range(3):
-            print(".", end="", flush=True)
-            time.sleep(0.5)
-        print()  
+            yield from scan_mailbox(session, *scan_args, skipped_emails=skipped_emails)
+        finally:
+            session.close()
+        return []
+
+    stop = threading.Event()
+    queues, threads = [], []
+    for account, folder in mailboxes:
+        out_queue = queue.Queue(maxsize=50)
+        thread = threading.Thread(target=_mailbox_worker, daemon=True,
+                                  args=(account, folder, out_queue, stop, skipped_emails, scan_args))
+        thread.start()
+        queues.append(out_queue)
+        threads.append(thread)
+
+    try:
+        # Always yields the latest of the mailboxes' next messages; exact only if every mailbox were date-sorted
+        yield from heapq.merge(*(_drain_queue(q) for q in queues), key=lambda parsed: parsed.email_date, reverse=True)
+    finally:
+        stop.set()
+        for out_queue in queues:  # Unblock producers waiting on a full queue
+            while not out_queue.empty():
+                out_queue.get_nowait()
+        for thread in threads:
+            thread.join(timeout=IMAP_TIMEOUT_SECONDS)
+
+def replay_cached_emails(folder="inbox", days=None, hours=None, since=None, before=None):
+    """
+    Offline mode: yield ParsedEmail records from the MessageCache alone, applying the same
+    window and header prefilter as a live scan. Useful for reprocessing after classifier changes.
+    """
+    start_date, end_date = compute_fetch_window(days, hours, since, before)
+    skipped_emails = load_json_file(SKIPPED_EMAILS)
+    cache = MessageCache()
+    print(f"🗄️ Replaying cached mail from {start_date:%Y-%m-%d %H:%M} to {end_date:%Y-%m-%d %H:%M}...")
+
+    newly_skipped = []
+    try:
+        for _, uid, raw_message in cache.iter_mailbox(mailbox_state_key(folder)):
+            survivor = _prefilter_headers(HEADER_PARSER.parsebytes(raw_message), start_date, end_date, skipped_emails,
+                                          newly_skipped.append)
+            if survivor is None:
+                continue
+            parsed = parsed_from_message(uid, survivor, email.message_from_bytes(raw_message))
+
+            print(f"\n📖 Processing Job Email: {parsed.email_date.strftime('%Y-%m-%d %H:%M:%S')} - {parsed.subject} (From: {parsed.sender})")
+            yield parsed
+    finally:
+        save_new_skips(newly_skipped)
+
+def _has_buffered_data(mail):
+    """
+    True when a line can be read without waiting: imaplib's reader (or SSL) may already hold bytes that
+    arrived with an earlier line, which select() on the socket can't see. Peeks with the socket non-blocking.
+    """
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+def idle_wait(mail, timeout):
+    """
+    Block in IMAP IDLE (RFC 2177) until the server announces new mail or timeout seconds pass.
+    Returns True when an EXISTS/RECENT update arrived. imaplib has no IDLE support, so the
+    command is driven by hand on the underlying connection, under a tag of our own.
+    """
+    tag = f"RRIDLE{next(IDLE_TAGS)}".encode()
+    mail.send(tag + b" IDLE\r\n")
+    line = mail.readline()
+    if not line.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+    new_mail = False
+    deadline = time.monotonic() + timeout
+    while not new_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not _has_buffered_data(mail):
+            readable, _, _ = select.select([mail.sock], [], [], remaining)
+            if not readable:
+                break
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed during IDLE")
+        if line.startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort(f"Server ended IDLE: {line!r}")
+        if line.rstrip().endswith((b"EXISTS", b"RECENT")):
+            new_mail = True
+
+    mail.send(b"DONE\r\n")
+    while True:  # Drain untagged updates until IDLE completes
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed while ending IDLE")
+        if line.startswith(tag):
+            break
+        if line.rstrip().endswith((b"EXISTS", b"RECENT")):
+            new_mail = True
+    return new_mail
+
+def watch_recruiter_emails(folder="inbox", days=None, hours=None):
+    """
+    Long-running push mode: keep one authenticated connection open and yield new recruiter emails
+    as they arrive, as the same ParsedEmail records as fetch_recent_recruiter_emails.
+    Uses IMAP IDLE (re-issued every IDLE_REFRESH_SECONDS) and reconnects with backoff when the
+    connection drops. Servers without IDLE are polled every IDLE_POLL_SECONDS instead.
+    """
+    session = ImapSession(folder)
+    reconnect_delay = 1
+    try:
+        while True:
+            try:
+                if session.mail is None:
+                    session.connect()
+                supports_idle = "IDLE" in session.capabilities
+                print(f"👂 Watching {folder} for new mail ({'IDLE' if supports_idle else 'polling'})...")
+
+                while True:
+                    yield from scan_mailbox(session, days, hours, incremental=True)
+                    reconnect_delay = 1  # A full scan succeeded; the connection is healthy
+                    if supports_idle:
+                        idle_wait(session.mail, IDLE_REFRESH_SECONDS)
+                    else:
+                        time.sleep(IDLE_POLL_SECONDS)
+                        session.call("noop")
+            except MailboxChangedError:
+                print("\n♻️ UIDVALIDITY changed; the next scan will resync the window.")
+                session.close()
+            except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+                print(f"\n⚠️ IMAP connection lost ({e}). Reconnecting in {reconnect_delay}s...")
+                session.close()
+                time.sleep(reconnect_delay)
+                reconnect_delay = min(reconnect_delay * 2, IDLE_RECONNECT_MAX_SECONDS)
+    finally:
+        session.close()
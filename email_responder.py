@@ -1,4 +1,5 @@
 import smtplib
+import hashlib
 import os
 import json
 import re
@@ -6,7 +7,13 @@ import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-from config import EMAIL_ADDRESS, EMAIL_PASSWORD, SMTP_SERVER, RESUME_PATH
+from config import EMAIL_ADDRESS, EMAIL_PASSWORD, SMTP_SERVER, RESUME_PATH, CLASSIFIER, HTML_TEXT_MAX_CHARS, TRIM_REPLIES
+import html_text
+import keyword_matcher
+import reply_trim
+from html_text import html_to_text
+from reply_trim import trim_reply
+from keyword_matcher import compile_terms, match_terms
 
 # Local LLM endpoint (optional). If unavailable, we fall back gracefully.
 OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
@@ -19,15 +26,83 @@ REJECT_BELOW = 65           # <65 -> decline
 
 def clean_html(raw_html: str) -> str:
     """Remove HTML tags and extract plain text from an email body."""
-    if raw_html is None:
-        return ""
-    try:
-        # Strip tags and collapse whitespace
-        text = re.sub(r"<[^>]+>", " ", raw_html)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-    except Exception:
-        return raw_html or ""
+    return html_to_text(raw_html)
+
+
+# Classifier cues. Sender hints are substrings of the From address; the blob cue lists are
+# compiled once into CUE_INDEX and matched as whole words (keyword_matcher), plural "s" included.
+# Other inflections are listed explicitly: "contractor" must be a term, but "corporate" no longer hits "rate".
+JOB_BOARD_DOMAINS = (
+    "@dice.com", "@connect.dice.com", "@alerts.indeed.com", "@indeed.com",
+    "@notifications.linkedin.com", "@linkedin.com", "@ziprecruiter.com",
+    "@monster.com", "@glassdoor.com"
+)
+MARKETING_SENDER_HINTS = (
+    "noreply", "no-reply", "donotreply", "info@", "sales@", "marketing@",
+    "newsletter@", "support@", "hello@", "team@", "updates@", "alerts@", "notifications@"
+)
+BLOB_CUES = {
+    # Strong negatives: newsletters / marketing platforms
+    "marketing_platform": (
+        "mailchimp", "sendgrid", "constantcontact", "hubspot", "marketo",
+        "pardot", "klaviyo", "mailgun", "sendinblue", "campaign", "mailer"
+    ),
+    "newsletter": (
+        "unsubscribe", "manage preferences", "view in browser",
+        "knowledge center", "digest", "job alert", "recommended jobs",
+        "intellisearch alert", "terms & conditions", "privacy policy"
+    ),
+    # Negatives: solar/retail sales outreach cues
+    "solar": (
+        "solar", "photovoltaic", "pv", "panel", "site survey", "proposal",
+        "estimate", "quote", "kwh", "net metering", "nem", "utility bill",
+        "pge", "pg&e", "roof", "installer", "powerwall", "inverter"
+    ),
+    "sales_cta": (
+        "schedule a call", "book a call", "book time", "get a quote", "free estimate",
+        "demo", "webinar", "limited time", "discount", "promo", "promotion", "save", "savings"
+    ),
+    # Positives: recruiter/job outreach cues
+    "strong_pos": ("recruiter", "recruiting", "recruitment", "talent acquisition", "sourcer", "hiring manager"),
+    "medium_pos": (
+        "contract", "contractor", "contracting", "contract-to-hire", "c2c", "w2", "1099", "interview",
+        "interviewing", "open role", "opening", "role", "position", "rate", "bill rate", "pay rate"
+    ),
+}
+CUE_INDEX = compile_terms(BLOB_CUES)
+RATE_PER_HOUR_RE = re.compile(r"\$?\s*\d+(?:\.\d{1,2})?\s*/?\s*(?:hr|hour)\b")
+
+# (feature, weight, reason) in reporting order; a message is job related when its weights sum above 0
+CUE_WEIGHTS = (
+    # Positives
+    ("strong_pos", 3, "strong recruiter cue"),
+    ("medium_pos", 1, "job terms"),
+    ("rate_per_hour", 1, "rate w/ hr"),
+    # Negatives (heavier)
+    ("job_board", -3, "job board domain"),
+    ("marketing_sender", -2, "marketing-y sender"),
+    ("marketing_platform", -2, "marketing platform"),
+    ("newsletter", -2, "newsletter phrasing"),
+    ("sales_cta", -2, "sales CTA"),
+    ("solar", -3, "solar/retail sales"),
+)
+
+# Tags cached verdicts (verdict_cache): derived from every table, pattern and setting that shapes the
+# scored text or its score, so editing a cue list, weight or cleaning rule invalidates old verdicts by
+# itself. Bump RULESET_REVISION for changes to the scoring code and TEXT_PIPELINE_REVISION for changes
+# to the html_text/reply_trim/keyword_matcher code that these tables don't show.
+RULESET_REVISION = 1
+TEXT_PIPELINE_REVISION = 1
+RULESET_VERSION = hashlib.sha1(repr((
+    RULESET_REVISION, BLOB_CUES, CUE_WEIGHTS, JOB_BOARD_DOMAINS, MARKETING_SENDER_HINTS, RATE_PER_HOUR_RE.pattern,
+    TEXT_PIPELINE_REVISION, TRIM_REPLIES, HTML_TEXT_MAX_CHARS,
+    html_text.TAG_RE.pattern, sorted(html_text.BLOCK_TAGS), sorted(html_text.HIDDEN_TAGS),  # Sets: sorted, their order varies per run
+    html_text.SPACES_RE.pattern, html_text.NEWLINES_RE.pattern,
+    reply_trim.CUT_RE.pattern, reply_trim.FORWARD_MARKER_RE.pattern, reply_trim.QUOTED_LINE_RE.pattern,
+    reply_trim.SIGNATURE_RE.pattern, reply_trim.SIGNATURE_MAX_LINES, keyword_matcher.SEPARATORS,
+)).encode("utf-8")).hexdigest()[:12]
+
+_job_model = None  # job_model module once imported (False when NumPy is missing)
 
 
 def check_subject_first(email_subject, sender: str = "", email_body: str = "") -> bool:
@@ -38,85 +113,76 @@ def check_subject_first(email_subject, sender: str = "", email_body: str = "") -
     """
     s_subject = (email_subject or "").lower()
     s_sender = (sender or "").lower()
-    s_body = clean_html(email_body or "").lower()
+    s_body = trim_reply(clean_html(email_body or "")).lower()
     blob = " ".join([s_subject, s_sender, s_body])
 
-    # Strong negatives: newsletters / job boards / marketing platforms
-    job_board_domains = [
-        "@dice.com", "@connect.dice.com", "@alerts.indeed.com", "@indeed.com",
-        "@notifications.linkedin.com", "@linkedin.com", "@ziprecruiter.com",
-        "@monster.com", "@glassdoor.com"
-    ]
-    marketing_platform_hints = [
-        "mailchimp", "sendgrid", "constantcontact", "hubspot", "marketo",
-        "pardot", "klaviyo", "mailgun", "sendinblue", "campaign", "mailer"
-    ]
-    marketing_sender_hints = [
-        "noreply", "no-reply", "donotreply", "info@", "sales@", "marketing@",
-        "newsletter@", "support@", "hello@", "team@", "updates@", "alerts@", "notifications@"
-    ]
-    newsletter_phrases = [
-        "unsubscribe", "manage preferences", "view in browser",
-        "knowledge center", "digest", "job alert", "recommended jobs",
-        "intellisearch alert", "terms & conditions", "privacy policy"
-    ]
+    # Subject-only checks (the header prefilter) stay on the rules: the model is trained on whole messages
+    is_job, score, reasons = classify_text(blob, s_sender, use_model=bool(email_body))
+    log_classification(is_job, score, reasons)
+    return is_job
 
-    # Negatives: solar/retail sales outreach cues
-    solar_terms = [
-        "solar", "photovoltaic", "pv", "panel", "site survey", "proposal",
-        "estimate", "quote", "kwh", "net metering", "nem", "utility bill",
-        "pge", "pg&e", "roof", "installer", "powerwall", "inverter"
-    ]
-    sales_cta = [
-        "schedule a call", "book a call", "book time", "get a quote", "free estimate",
-        "demo", "webinar", "limited time", "discount", "promo", "promotion", "save"
-    ]
 
-    # Positives: recruiter/job outreach cues
-    strong_pos = ["recruiter", "talent acquisition", "sourcer", "hiring manager"]
-    medium_pos = [
-        "contract", "contract-to-hire", "c2c", "w2", "1099", "interview",
-        "open role", "opening", "role", "position", "rate", "bill rate", "pay rate"
-    ]
+def log_classification(is_job, score, reasons, cached=False):
+    print(f"[classifier] job_related={is_job} score={score} reasons={reasons}{' (cached)' if cached else ''}")
 
-    score = 0
-    reasons = []
 
-    # Positives
-    if any(p in blob for p in strong_pos):
-        score += 3
-        reasons.append("strong recruiter cue")
-    if any(p in blob for p in medium_pos):
-        score += 1
-        reasons.append("job terms")
+def cue_features(blob, s_sender):
+    """The set of CUE_WEIGHTS features present in a lowercased blob and sender (no scoring)."""
+    features = match_terms(blob, CUE_INDEX)  # One pass over the blob for every cue list
     # numeric rate with hr/hour nearby
-    if re.search(r"\$?\s*\d+(?:\.\d{1,2})?\s*/?\s*(?:hr|hour)\b", blob):
-        score += 1
-        reasons.append("rate w/ hr")
+    if ("hr" in blob or "hour" in blob) and RATE_PER_HOUR_RE.search(blob):
+        features.add("rate_per_hour")
+    if any(d in s_sender for d in JOB_BOARD_DOMAINS):
+        features.add("job_board")
+    if any(h in s_sender for h in MARKETING_SENDER_HINTS):
+        features.add("marketing_sender")
+    return features
+
+
+def load_job_model():
+    """The job_model module when config.CLASSIFIER is "model" and NumPy is installed, else None."""
+    global _job_model
+    if CLASSIFIER != "model":
+        return None
+    if _job_model is None:
+        try:
+            import job_model
+        except ImportError as e:
+            print(f"⚠️ CLASSIFIER=model needs NumPy ({e}); using the keyword rules.")
+            job_model = False
+        _job_model = job_model
+    return _job_model or None
+
+
+def classifier_version():
+    """RULESET_VERSION for rule verdicts; None while the learned model decides (it changes with every decision)."""
+    model = load_job_model()
+    return None if model is not None and model.usable_model() is not None else RULESET_VERSION
 
-    # Negatives (heavier)
-    if any(d in s_sender for d in job_board_domains):
-        score -= 3
-        reasons.append("job board domain")
-    if any(h in s_sender for h in marketing_sender_hints):
-        score -= 2
-        reasons.append("marketing-y sender")
-    if any(p in blob for p in marketing_platform_hints):
-        score -= 2
-        reasons.append("marketing platform")
-    if any(p in blob for p in newsletter_phrases):
-        score -= 2
-        reasons.append("newsletter phrasing")
-    if any(p in blob for p in sales_cta):
-        score -= 2
-        reasons.append("sales CTA")
-    if any(p in blob for p in solar_terms):
-        score -= 3
-        reasons.append("solar/retail sales")
+
+def classify_text(blob, s_sender, use_model=True):
+    """
+    Score an already lowercased "subject sender body" blob (and lowercased sender).
+    Returns (is_job, score, reasons); check_subject_first and ParsedEmail both use it.
+    With CLASSIFIER="model" and a trained job_model the learned model decides; otherwise the
+    CUE_WEIGHTS rules do (batch_classifier.classify_batch scores many messages with the same weights).
+    """
+    model = load_job_model() if use_model else None
+    if model is not None:
+        verdict = model.classify(blob, s_sender)
+        if verdict is not None:
+            return verdict
+
+    features = cue_features(blob, s_sender)
+    score = 0
+    reasons = []
+    for feature, weight, reason in CUE_WEIGHTS:
+        if feature in features:
+            score += weight
+            reasons.append(reason)
 
     is_job = score > 0
-    print(f"[classifier] job_related={is_job} score={score} reasons={reasons}")
-    return is_job
+    return is_job, score, reasons
 
 
 def extract_rate_location(email_subject: str, email_body: str):
@@ -124,8 +190,15 @@ def extract_rate_location(email_subject: str, email_body: str):
     Extract a human-readable pay rate and location from the message using regex heuristics.
     Returns (rate_str, location_str). If unknown, returns 'Unknown'.
     """
-    text = f"{email_subject or ''} \n {clean_html(email_body or '')}".lower()
+    cleaned_body = trim_reply(clean_html(email_body or ""))
+    return extract_rate_location_text(f"{email_subject or ''} \n {cleaned_body}".lower(), cleaned_body)
+
 
+def extract_rate_location_text(text, cleaned_body):
+    """
+    extract_rate_location on prepared text: `text` is the lowercased "subject \\n body" and
+    `cleaned_body` the cleaned body with its case intact (city names are matched on it).
+    """
     # Rate detection: handle ranges like $80-90/hr, 80–90/hour, $85/hr
     rate_match = re.search(
         r"(\$?\s*\d+(?:\.\d{1,2})?)\s*(?:[-–]\s*\$?\s*\d+(?:\.\d{1,2})?)?\s*/?\s*(?:hr|hour)\b",
@@ -149,7 +222,7 @@ def extract_rate_location(email_subject: str, email_body: str):
         # Try to capture patterns like "San Jose, CA" or "Austin, TX"
         m_city = re.search(
             r"\b([A-Z][a-zA-Z]+(?:\s[A-Z][a-zA-Z]+)*),\s*([A-Z]{2})\b",
-            clean_html(email_body or "")
+            cleaned_body
         )
         if m_city:
             location = f"{m_city.group(1)}, {m_city.group(2)}"
@@ -157,22 +230,25 @@ def extract_rate_location(email_subject: str, email_body: str):
     return rate_str, location
 
 
-def generate_response(email_subject, email_body, sender):
+def generate_response(email_subject, email_body, sender, parsed=None):
     """
     Generate an AI response for a recruiter email using Ollama when available.
     - Never raises: always returns a string ("" means 'skip sending').
     - Verbose logging for HTTP/JSON/other failures.
     - Deterministic fallback reply if the LLM call fails or returns nothing.
+    - `parsed` (a ParsedEmail for the same message) supplies the cleaned body, classification
+      and rate/location it has already computed, instead of redoing that work here.
     """
     # Early guard: never respond to newsletters / job alerts / sales/marketing
-    if check_subject_first(email_subject, sender, email_body) is False:
+    is_job = parsed.is_job if parsed is not None else check_subject_first(email_subject, sender, email_body)
+    if is_job is False:
         print("ℹ️ Skipping auto-reply: newsletter/marketing/sales detected.")
         return ""  # caller should treat empty as 'do not send'
 
     def _fallback_template_reply(subject, body, from_addr, error_info=None):
         # Attempt to extract metadata
         try:
-            rate, location = extract_rate_location(subject, body)
+            rate, location = parsed.rate_location if parsed is not None else extract_rate_location(subject, body)
         except Exception:
             rate, location = "Unknown", "Unknown"
 
@@ -265,7 +341,7 @@ Always mention preference for fully-remote roles. Keep it concise and sign as "S
 Subject: {email_subject}
 From: {sender}
 Email (plain text):
-{clean_html(email_body)}
+{parsed.trimmed_body if parsed is not None else trim_reply(clean_html(email_body))}
 """
 
     # Try Ollama, but never crash if it fails
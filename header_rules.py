@@ -0,0 +1,56 @@
+import re
+from collections import Counter, namedtuple
+from config import HEADER_RULES_DISABLED
+
+# Bulk/automated mail markers checked on the header-only fetch, before any body is downloaded.
+# (reason code, header, value pattern); a None pattern means the header being present is enough.
+HEADER_RULES = (
+    ("mailing-list", "List-Id", None),
+    ("list-unsubscribe", "List-Unsubscribe", None),
+    ("bulk-precedence", "Precedence", r"^\s*(?:bulk|list|junk)\b"),
+    ("auto-submitted", "Auto-Submitted", r"^\s*(?!no\b)\S"),  # RFC 3834: anything but "no"
+    ("auto-reply", "X-Autoreply", None),
+    ("auto-reply", "X-Autorespond", None),
+    ("esp-mailgun", "X-Mailgun-Sid", None),
+    ("esp-mailgun", "X-Mailgun-Tag", None),
+    ("esp-sendgrid", "X-SG-EID", None),
+    ("esp-mailchimp", "X-MC-User", None),
+    ("esp-campaign", "X-Campaign", None),
+    ("esp-campaign", "X-CampaignID", None),
+)
+
+CompiledRule = namedtuple("CompiledRule", "reason header pattern")
+
+
+def compile_rules(rules, disabled=()):
+    """Compile the value patterns once; rules whose reason code is in `disabled` are dropped."""
+    return tuple(CompiledRule(reason, header, re.compile(pattern, re.IGNORECASE) if pattern else None)
+                 for reason, header, pattern in rules if reason not in disabled)
+
+
+RULES = compile_rules(HEADER_RULES, HEADER_RULES_DISABLED)
+# Every header the rules look at, for BODY.PEEK[HEADER.FIELDS (...)]
+RULE_HEADERS = tuple(dict.fromkeys(rule.header.upper() for rule in RULES))
+
+rejections = Counter()  # reason code -> messages rejected since the last report
+
+
+def match_header_rules(headers, rules=RULES):
+    """Return the reason code of the first rule the headers trip, or None when the mail looks personal."""
+    for rule in rules:
+        value = headers.get(rule.header)
+        if value is None:
+            continue
+        if rule.pattern is None or rule.pattern.search(str(value)):
+            return rule.reason
+    return None
+
+
+def report_rejections():
+    """One-line summary of the rejections counted since the last call (then reset), or "" when none."""
+    if not rejections:
+        return ""
+    summary = ", ".join(f"{reason}={count}" for reason, count in rejections.most_common())
+    total = sum(rejections.values())
+    rejections.clear()
+    return f"{total} ({summary})"
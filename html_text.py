@@ -0,0 +1,81 @@
+import html
+import re
+from config import HTML_TEXT_MAX_CHARS
+
+# Elements whose contents are never visible text
+HIDDEN_TAGS = frozenset({"script", "style", "head", "title", "noscript", "template", "svg", "object"})
+# Elements that start a new line of text; every other tag (td/th cells, spans, images...) separates words
+BLOCK_TAGS = frozenset({
+    "br", "p", "div", "tr", "li", "ul", "ol", "table", "section", "article", "header", "footer",
+    "blockquote", "pre", "hr", "h1", "h2", "h3", "h4", "h5", "h6",
+})
+
+# One markup token: a start/end tag (groups: "/", name), a comment, or a <!DOCTYPE>/<?xml?> declaration.
+# A "<" that starts none of these (e.g. "a < b") stays text.
+TAG_RE = re.compile(r"<(?:(/?)([a-zA-Z][\w:-]*)(?:\s[^>]*)?/?>|!--.*?(?:-->|$)|[!?][^>]*>)", re.DOTALL)
+HIDDEN_END_RE = {tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in HIDDEN_TAGS}
+
+# Only runs that actually change are matched, so ordinary single spaces and newlines cost nothing.
+# A "-- " signature delimiter line keeps its trailing space (reply_trim.SIGNATURE_RE needs it).
+SPACES_RE = re.compile(r"[^\S\n]{2,}|[^\S\n ]")
+NEWLINES_RE = re.compile(r"\n[\n ]+|(?<!\n--)(?<!^--) \n[\n ]*")
+
+
+def collapse_whitespace(text):
+    """Squeeze runs of spaces/tabs to one space and blank-line runs to one newline."""
+    return NEWLINES_RE.sub("\n", SPACES_RE.sub(" ", text)).strip()
+
+
+def html_to_text(raw_html, max_chars=HTML_TEXT_MAX_CHARS):
+    """
+    Convert an HTML (or plain text) body to readable text in one left-to-right pass over its tokens:
+    script/style and other hidden elements are jumped over, entities decoded, whitespace collapsed
+    (block elements become line breaks, other tags a space) and the result capped at max_chars (0 = no cap).
+    Tokenizing stops as soon as enough text has been collected, so huge newsletters cost little.
+    """
+    if not raw_html:
+        return ""
+    limit = max_chars * 2 if max_chars else None  # Headroom for whitespace collapsing
+    pieces = []
+    length = 0
+    pos = 0
+    search = TAG_RE.search
+
+    while True:
+        match = search(raw_html, pos)
+        text = raw_html[pos:match.start()] if match else raw_html[pos:]
+        if text:
+            pieces.append(text)
+            length += len(text)
+            if limit and length >= limit:
+                break
+        if match is None:
+            break
+
+        pos = match.end()
+        tag = match.group(2)
+        if tag is None:  # Comment or declaration
+            continue
+        tag = tag.lower()
+        if tag in HIDDEN_TAGS:
+            if not match.group(1) and not match.group(0).endswith("/>"):
+                end = HIDDEN_END_RE[tag].search(raw_html, pos)
+                pos = end.end() if end else len(raw_html)
+        elif tag in BLOCK_TAGS:
+            pieces.append("\n")
+        else:
+            pieces.append(" ")  # Like the old tag-to-space cleaning, so "<td>Type</td><td>Contract</td>" keeps two words
+
+    text = "".join(pieces)
+    if "&" in text:
+        text = html.unescape(text)  # Once for the whole text; tags are gone, so entities can't be split
+    return collapse_whitespace(text)[:max_chars or None]
+
+
+def plain_to_text(text, max_chars=HTML_TEXT_MAX_CHARS):
+    """The text/plain counterpart of html_to_text: whitespace collapsed and capped, nothing else touched."""
+    if not text:
+        return ""
+    if max_chars:
+        text = text[:max_chars * 2]
+    return collapse_whitespace(text)[:max_chars or None]
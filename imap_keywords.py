@@ -0,0 +1,142 @@
+import imaplib
+import threading
+from config import IMAP_KEYWORDS, KEYWORD_SKIPPED, KEYWORD_REPLIED, ARCHIVE_SKIPPED, ARCHIVE_FOLDER
+from imap_session import ImapSession, CONNECTION_ERRORS, compress_uid_set
+
+# Mail carrying any of these has been dealt with and is excluded from searches
+HANDLED_KEYWORDS = (KEYWORD_SKIPPED, KEYWORD_REPLIED)
+
+KEYWORD_LOCK = threading.Lock()  # Decisions are queued by main while fetcher threads flush
+_locations = {}  # email_id -> (mailbox, uid) for messages handed to process_recruiter_emails
+_pending = {}    # mailbox -> {keyword: set of UIDs} waiting for a STORE
+_archive = {}    # mailbox -> set of UIDs skipped for good, moved to ARCHIVE_FOLDER at the end of a scan
+_credentials = {}  # (server, address) -> password, so the final flush can reconnect
+
+# A mailbox is (server, address, folder); passwords stay out of the queue keys
+
+
+def account_mailbox(folder, server, address, password):
+    """The mailbox key for a folder of an account, remembering the account's password for flush_all_pending."""
+    with KEYWORD_LOCK:
+        _credentials[(server, address)] = password
+    return server, address, folder
+
+
+def session_mailbox(session):
+    return account_mailbox(session.folder, session.server, session.address, session.password)
+
+
+def supports_keywords(permanentflags):
+    """True when the mailbox keeps custom keywords (PERMANENTFLAGS lists \\* or our keywords already)."""
+    if not IMAP_KEYWORDS:
+        return False
+    return "\\*" in permanentflags or all(keyword in permanentflags for keyword in HANDLED_KEYWORDS)
+
+
+def unkeyword_criteria(permanentflags):
+    """SEARCH criteria excluding mail that was already skipped or replied to, or [] without keyword support."""
+    if not supports_keywords(permanentflags):
+        return []
+    criteria = []
+    for keyword in HANDLED_KEYWORDS:
+        criteria += ["UNKEYWORD", keyword]
+    return criteria
+
+
+def remember_location(email_id, mailbox, uid):
+    """Record where a yielded message lives so a later decision on it can be stored on the server."""
+    with KEYWORD_LOCK:
+        _locations[email_id] = (mailbox, uid)
+
+
+def mark_uids(mailbox, uids, keyword):
+    """Queue a keyword for UIDs of one mailbox; KEYWORD_SKIPPED also queues them for archiving."""
+    if not uids:
+        return
+    with KEYWORD_LOCK:
+        if IMAP_KEYWORDS:
+            _pending.setdefault(mailbox, {}).setdefault(keyword, set()).update(uids)
+        if ARCHIVE_SKIPPED and keyword == KEYWORD_SKIPPED:
+            _archive.setdefault(mailbox, set()).update(uids)
+
+
+def message_location(email_id):
+    """(mailbox, uid) of a message handed to process_recruiter_emails, or None when unknown."""
+    with KEYWORD_LOCK:
+        return _locations.get(email_id)
+
+
+def mark_message(email_id, keyword):
+    """Queue a keyword for a message by the email_id main uses. Unknown ids (e.g. offline replays) are ignored."""
+    with KEYWORD_LOCK:
+        location = _locations.get(email_id)
+    if location is not None:
+        mark_uids(location[0], [location[1]], keyword)
+
+
+def flush_keywords(session):
+    """
+    Issue the queued STOREs for the session's mailbox (one +FLAGS.SILENT per keyword).
+    Failures are reported and the UIDs re-queued for the next flush.
+    """
+    mailbox = session_mailbox(session)
+    with KEYWORD_LOCK:
+        pending = _pending.pop(mailbox, None)
+    if not pending:
+        return 0
+    if not supports_keywords(session.select_info.get("permanentflags", ())):
+        return 0
+
+    stored = 0
+    for keyword, uids in pending.items():
+        try:
+            session.uid("STORE", compress_uid_set(uids), "+FLAGS.SILENT", f"({keyword})")
+            stored += len(uids)
+        except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+            print(f"⚠️ Could not store {keyword} on {len(uids)} messages: {e}")
+            mark_uids(mailbox, uids, keyword)
+    return stored
+
+
+def archive_skipped(session):
+    """
+    Move the session mailbox's queued skipped UIDs to ARCHIVE_FOLDER in one batch (see ImapSession.move).
+    Call after flush_keywords so the keywords travel with the messages. Returns the number moved.
+    """
+    mailbox = session_mailbox(session)
+    with KEYWORD_LOCK:
+        uids = _archive.pop(mailbox, None)
+    if not uids or session.folder.lower() == ARCHIVE_FOLDER.lower():
+        return 0
+    try:
+        if not session.move(uids, ARCHIVE_FOLDER):
+            print(f"⚠️ {session.server} supports neither MOVE nor UIDPLUS; skipped mail stays in {session.folder}.")
+            return 0
+    except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+        print(f"⚠️ Could not archive {len(uids)} skipped messages: {e}")
+        with KEYWORD_LOCK:
+            _archive.setdefault(mailbox, set()).update(uids)
+        return 0
+    print(f"📦 Archived {len(uids)} skipped messages from {session.folder} to {ARCHIVE_FOLDER}.")
+    return len(uids)
+
+
+def flush_all_pending():
+    """Store queued keywords and archive queued UIDs, reconnecting to mailboxes whose scan has already finished."""
+    with KEYWORD_LOCK:
+        mailboxes = set(_pending) | set(_archive)
+    for mailbox in mailboxes:
+        server, address, folder = mailbox
+        with KEYWORD_LOCK:
+            password = _credentials.get((server, address))
+        session = ImapSession(folder, server, address, password)
+        try:
+            session.call("noop")  # Connect + SELECT
+            stored = flush_keywords(session)
+            if stored:
+                print(f"🏷️ Stored processing keywords on {stored} messages in {folder}.")
+            archive_skipped(session)
+        except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+            print(f"⚠️ Could not store processing keywords in {folder} of {address}: {e}")
+        finally:
+            session.close()
@@ -0,0 +1,224 @@
+import imaplib
+import random
+import time
+from config import (
+    EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER,
+    IMAP_TIMEOUT_SECONDS, IMAP_MAX_RETRIES, IMAP_BACKOFF_BASE_SECONDS, IMAP_BACKOFF_MAX_SECONDS,
+)
+
+# Failures that mean the connection itself is unusable (ssl.SSLError and socket errors are OSErrors)
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError)
+
+
+def compress_uid_set(uids):
+    """Render UIDs as a compact IMAP sequence set, e.g. [1, 2, 3, 7] -> "1:3,7"."""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def parse_uid_set(text):
+    """Expand an IMAP sequence set such as "1:3,7" into a set of ints (no "*" support)."""
+    uids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition(":")
+        low, high = int(low), int(high or low)
+        uids.update(range(min(low, high), max(low, high) + 1))
+    return uids
+
+
+def quote_string(value):
+    """IMAP quoted string for LOGIN/SELECT/COPY arguments."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class MailboxChangedError(imaplib.IMAP4.error):
+    """UIDVALIDITY changed across a reconnect, so previously searched UIDs no longer apply."""
+
+
+class ImapSession:
+    """
+    Wrapper around imaplib.IMAP4_SSL that keeps one mailbox selected and survives broken connections.
+    Commands are retried with exponential backoff and full jitter; a connection-level failure triggers
+    a reconnect and re-SELECT before the retry. Retry/reconnect/drop counts are kept for reporting.
+    """
+
+    def __init__(self, folder="inbox", server=None, address=None, password=None,
+                 max_retries=IMAP_MAX_RETRIES, backoff_base=IMAP_BACKOFF_BASE_SECONDS,
+                 backoff_max=IMAP_BACKOFF_MAX_SECONDS):
+        self.folder = folder
+        self.server = server or IMAP_SERVER
+        self.address = address or EMAIL_ADDRESS
+        self.password = password or EMAIL_PASSWORD
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.mail = None
+        self.select_info = {}
+        self.retries = 0
+        self.reconnects = 0
+        self.dropped = 0
+
+    def connect(self):
+        """Open the connection, log in and SELECT the folder. Raises imaplib.IMAP4.error on failure."""
+        self.mail = imaplib.IMAP4_SSL(self.server, timeout=IMAP_TIMEOUT_SECONDS)
+        try:
+            self.mail.login(self.address, self.password)
+            qresync = self._enable_change_tracking()
+            status, _ = self.mail.select(self.folder)
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"Could not select {self.folder}")
+        except Exception:
+            self.close()  # Never leave a connection that isn't logged in and selected for call() to reuse
+            raise
+
+        uidvalidity = self._response_number("UIDVALIDITY")
+        previous = self.select_info.get("uidvalidity")
+        self.select_info = {
+            "uidvalidity": uidvalidity,
+            "uidnext": self._response_number("UIDNEXT"),
+            "highestmodseq": self._response_number("HIGHESTMODSEQ"),  # None without CONDSTORE (or NOMODSEQ)
+            "qresync": qresync,
+            "permanentflags": self._response_flags("PERMANENTFLAGS"),
+        }
+        if previous is not None and uidvalidity != previous:
+            raise MailboxChangedError(f"UIDVALIDITY of {self.folder} changed from {previous} to {uidvalidity}")
+        return self
+
+    def _enable_change_tracking(self):
+        """
+        Refresh capabilities after login and ENABLE QRESYNC (or CONDSTORE) when offered, which must
+        happen before SELECT. Returns True when QRESYNC is active.
+        """
+        typ, data = self.mail.capability()
+        if typ == "OK" and data and data[-1]:
+            self.mail.capabilities = tuple(data[-1].decode().upper().split())
+        if "ENABLE" not in self.mail.capabilities:
+            return False
+        for extension in ("QRESYNC", "CONDSTORE"):
+            if extension in self.mail.capabilities:
+                try:
+                    typ, _ = self.mail.enable(extension)
+                except imaplib.IMAP4.error:
+                    continue
+                if typ == "OK":
+                    return extension == "QRESYNC"
+        return False
+
+    def reconnect(self):
+        """Drop the current connection and open a fresh one on the same folder."""
+        self.close()
+        self.reconnects += 1
+        return self.connect()
+
+    def close(self):
+        """Log out, ignoring errors from connections that are already gone."""
+        if self.mail is not None:
+            try:
+                self.mail.logout()
+            except Exception:
+                pass
+            self.mail = None
+
+    def _response_number(self, name):
+        """Read a numeric SELECT response code (UIDVALIDITY, UIDNEXT, ...) from imaplib, or None."""
+        _, data = self.mail.response(name)
+        try:
+            return int(data[-1])
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def _response_flags(self, name):
+        """Read a flag-list response code such as PERMANENTFLAGS from imaplib as a tuple of flags."""
+        _, data = self.mail.response(name)
+        if not data or not isinstance(data[-1], bytes):
+            return ()
+        return tuple(data[-1].decode(errors="replace").strip("()").split())
+
+    @property
+    def capabilities(self):
+        return self.mail.capabilities if self.mail is not None else ()
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff: uniform in [0, min(max, base * 2**attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, command, *args):
+        """
+        Run an imaplib method by name (e.g. "uid", "noop"), retrying failures.
+        Non-OK responses count as failures. MailboxChangedError is never retried.
+        """
+        label = f"{command.upper()} {args[0]}" if command == "uid" and args else command.upper()
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.mail is None:
+                    self.connect()
+                typ, data = getattr(self.mail, command)(*args)
+                if typ != "OK":
+                    raise imaplib.IMAP4.error(f"{label} returned {typ}: {data!r}")
+                return typ, data
+            except MailboxChangedError:
+                raise
+            except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = self.backoff_delay(attempt)
+                print(f"\n⚠️ IMAP {label} failed ({e}). Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...")
+                time.sleep(delay)
+                if isinstance(e, CONNECTION_ERRORS) or self.mail is None:
+                    self.reconnect_quietly()
+
+    def reconnect_quietly(self):
+        """Reconnect, leaving self.mail unset on failure so the next attempt tries again."""
+        try:
+            self.reconnect()
+        except MailboxChangedError:
+            raise
+        except (imaplib.IMAP4.error, *CONNECTION_ERRORS) as e:
+            print(f"⚠️ Reconnect to {self.server} failed: {e}")
+            self.close()
+
+    def uid(self, command, *args):
+        """UID command (SEARCH, FETCH, STORE, ...) with retry."""
+        return self.call("uid", command, *args)
+
+    def move(self, uids, folder):
+        """
+        Move UIDs to another folder (created if missing): UID MOVE when offered, else COPY, \\Deleted and
+        UID EXPUNGE (UIDPLUS), which never expunges anything else. Returns False when neither is supported.
+        """
+        if "MOVE" not in self.capabilities and "UIDPLUS" not in self.capabilities:
+            return False
+        target = quote_string(folder)
+        if self.mail is None:
+            self.connect()
+        try:
+            self.mail.create(target)  # NO when it already exists, which is fine
+        except imaplib.IMAP4.error:
+            pass
+
+        uid_set = compress_uid_set(uids)
+        if "MOVE" in self.capabilities:
+            self.uid("MOVE", uid_set, target)
+        else:
+            self.uid("COPY", uid_set, target)
+            self.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Deleted)")
+            self.uid("EXPUNGE", uid_set)
+        return True
+
+    def record_drop(self, count):
+        """Count messages that were given up on after all retries."""
+        self.dropped += count
+
+    def report(self):
+        """One-line summary of the session's retry behaviour."""
+        return f"retries={self.retries} reconnects={self.reconnects} dropped={self.dropped}"
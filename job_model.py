@@ -0,0 +1,203 @@
+"""
+Hashed-feature logistic regression for "is this a recruiter email?", learned from our own decisions:
+mail from senders we replied to (sent_emails.json) is positive, mail we skipped (skipped_emails.json)
+negative. Train from the message cache with:  python job_model.py
+With config.CLASSIFIER = "model" it replaces the keyword weights behind check_subject_first and keeps
+learning from every send/skip decision. Requires NumPy (pip install numpy).
+"""
+import email
+import os
+import random
+import zlib
+from collections import namedtuple
+from email.utils import parsedate_to_datetime, parseaddr
+import numpy as np
+from config import JOB_MODEL_FILE, JOB_MODEL_HASH_BITS, JOB_MODEL_MIN_EXAMPLES, JOB_MODEL_THRESHOLD
+from email_processor import SKIPPED_EMAILS, SENT_EMAILS, parsed_from_message, to_local_naive
+from keyword_matcher import tokenize
+from message_cache import MessageCache
+from utils import load_json_file
+
+LEARNING_RATE = 0.1
+L2 = 1e-6           # Weight decay per update, so rare tokens can't dominate
+TRAIN_EPOCHS = 5
+HOLDOUT_SHARE = 0.2  # Share of the history kept out of training to report accuracy
+
+# weights: float32 per hash bucket; bias and seen (examples learned) are 1-element arrays so updates stay in place
+JobModel = namedtuple("JobModel", "weights bias seen")
+
+_model = None       # Model loaded for classify/learn (None until first use)
+_updated = False    # learn() changed it since the last save
+
+
+def new_model(hash_bits=JOB_MODEL_HASH_BITS):
+    return JobModel(np.zeros(1 << hash_bits, dtype=np.float32), np.zeros(1, dtype=np.float32),
+                    np.zeros(1, dtype=np.int64))
+
+
+def hashed_features(blob, sender, hash_bits=JOB_MODEL_HASH_BITS):
+    """
+    Bucket indices of the words in a lowercased "subject sender body" blob plus the sender's domain.
+    crc32 keeps the hashing stable across runs (str hashes are salted per process).
+    """
+    mask = (1 << hash_bits) - 1
+    tokens = tokenize(blob)
+    domain = parseaddr(sender)[1].rpartition("@")[2].lower()
+    if domain:
+        tokens.add(b"from@" + domain.encode("utf-8"))
+    return np.fromiter({zlib.crc32(token) & mask for token in tokens}, dtype=np.int64)
+
+
+def logit(model, features):
+    return float(model.weights[features].sum() + model.bias[0])
+
+
+def predict(model, features):
+    """Probability that the message is job related."""
+    return 1.0 / (1.0 + np.exp(-max(min(logit(model, features), 30.0), -30.0)))
+
+
+def update(model, features, label, learning_rate=LEARNING_RATE):
+    """One SGD step of logistic loss on a single example (label 1 = job, 0 = not)."""
+    error = predict(model, features) - label
+    weights = model.weights[features]
+    model.weights[features] = weights - learning_rate * (error + L2 * weights)
+    model.bias[0] -= learning_rate * error
+    model.seen[0] += 1
+
+
+def train(examples, model=None, epochs=TRAIN_EPOCHS):
+    """Fit on [(features, label)] with shuffled SGD passes, starting from `model` if given."""
+    model = model or new_model()
+    examples = list(examples)
+    for _ in range(epochs):
+        random.shuffle(examples)
+        for features, label in examples:
+            update(model, features, label)
+    return model
+
+
+def accuracy(model, examples):
+    examples = list(examples)
+    if not examples:
+        return None
+    correct = sum((predict(model, features) >= JOB_MODEL_THRESHOLD) == bool(label) for features, label in examples)
+    return correct / len(examples)
+
+
+def save_model(model, path=JOB_MODEL_FILE):
+    """Write the weights as a compressed .npz (mostly zero buckets compress to a few KB)."""
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, weights=model.weights, bias=model.bias, seen=model.seen)
+    os.replace(tmp_path, path)
+
+
+def load_model(path=JOB_MODEL_FILE):
+    """The saved model, or None when it hasn't been trained yet."""
+    try:
+        with np.load(path) as data:
+            return JobModel(data["weights"].astype(np.float32), data["bias"].astype(np.float32),
+                            data["seen"].astype(np.int64))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def current_model():
+    global _model
+    if _model is None:
+        _model = load_model()
+    return _model
+
+
+def usable_model():
+    """The current model once it has learned JOB_MODEL_MIN_EXAMPLES examples, else None."""
+    model = current_model()
+    if model is None or model.seen[0] < JOB_MODEL_MIN_EXAMPLES:
+        return None
+    return model
+
+
+def classify(blob, sender):
+    """
+    check_subject_first-compatible verdict: (is_job, score, reasons), score being the logit.
+    Returns None until the model has learned enough (usable_model), so the caller falls back to the rules.
+    """
+    model = usable_model()
+    if model is None:
+        return None
+    features = hashed_features(blob, sender)
+    probability = predict(model, features)
+    return bool(probability >= JOB_MODEL_THRESHOLD), round(logit(model, features), 2), [f"model p={probability:.2f}"]
+
+
+def learn(blob, sender, label):
+    """Incrementally learn one decision (1 = replied, 0 = skipped for good); saved by save_if_updated."""
+    global _model, _updated
+    model = current_model()
+    if model is None:
+        model = _model = new_model()
+    update(model, hashed_features(blob, sender), label)
+    _updated = True
+
+
+def save_if_updated():
+    global _updated
+    if _updated and _model is not None:
+        save_model(_model)
+        _updated = False
+        print(f"🧠 Saved job model ({int(_model.seen[0])} examples learned) to {JOB_MODEL_FILE}.")
+
+
+def history_label(msg, skipped_emails, sent_emails):
+    """1/0 for a cached message we replied to / skipped (same keys main and the prefilter write), else None."""
+    sender = msg.get("From", "")
+    subject = msg.get("Subject", "")
+    try:
+        email_date = to_local_naive(parsedate_to_datetime(msg["Date"]))
+    except (TypeError, ValueError, IndexError):
+        email_date = None
+    if email_date is not None and f"{email_date} - {sender}" in skipped_emails:
+        return 0
+    if sender in sent_emails:
+        return 1
+    if f"{subject} - {sender}" in skipped_emails:
+        return 0
+    return None
+
+
+def iter_history_examples():
+    """(features, label) for every labeled message in the message cache (all mailboxes)."""
+    skipped_emails = load_json_file(SKIPPED_EMAILS)
+    sent_emails = load_json_file(SENT_EMAILS)
+    for _, uid, raw_message in MessageCache().iter_all():
+        msg = email.message_from_bytes(raw_message)
+        label = history_label(msg, skipped_emails, sent_emails)
+        if label is None:
+            continue
+        parsed = parsed_from_message(uid, (msg.get("Date"), msg.get("From", ""), msg.get("Subject", "")), msg)
+        yield hashed_features(parsed.blob, parsed.sender), label
+
+
+def train_from_history():
+    """Retrain from scratch on the labeled cache, report holdout accuracy, then fit on everything and save."""
+    examples = list(iter_history_examples())
+    positives = sum(label for _, label in examples)
+    print(f"🧠 {len(examples)} labeled messages in the cache ({positives} replied, {len(examples) - positives} skipped).")
+    if not examples:
+        print("Nothing to train on yet: decisions are only labels once their mail is in the message cache.")
+        return None
+
+    random.shuffle(examples)
+    split = int(len(examples) * (1 - HOLDOUT_SHARE))
+    holdout_accuracy = accuracy(train(examples[:split]), examples[split:])
+    if holdout_accuracy is not None:
+        print(f"📏 Holdout accuracy: {holdout_accuracy:.1%} on {len(examples) - split} messages.")
+
+    model = train(examples)
+    save_model(model)
+    print(f"💾 Saved {JOB_MODEL_FILE} ({os.path.getsize(JOB_MODEL_FILE) / 1024:.0f} KiB).")
+    return model
+
+
+if __name__ == "__main__":
+    train_from_history()
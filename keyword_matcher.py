@@ -0,0 +1,62 @@
+import re
+import string
+from collections import namedtuple
+
+# Punctuation becomes a word break; "&" stays part of a word so terms like "pg&e" survive.
+# Working on UTF-8 bytes keeps translate() and split() on their fast C paths for any text.
+SEPARATORS = string.punctuation.replace("&", "").encode("ascii")
+TOKEN_TABLE = bytes.maketrans(SEPARATORS, b" " * len(SEPARATORS))
+
+# words: token -> categories it hits. phrases: first token of a multi-word term -> ((category, regex), ...)
+KeywordIndex = namedtuple("KeywordIndex", "words phrases")
+
+
+def _tokens(term):
+    return term.lower().encode("utf-8").translate(TOKEN_TABLE).split()
+
+
+def compile_terms(categories):
+    """
+    Compile {category: terms} into a KeywordIndex for match_terms. Terms match as whole words, with an
+    optional plural "s"; a multi-word term ("book a call", "contract-to-hire") matches its words in order
+    separated by spaces or punctuation.
+    """
+    words, phrases = {}, {}
+    for category, terms in categories.items():
+        for term in terms:
+            tokens = _tokens(term)
+            if len(tokens) == 1:
+                for word in (tokens[0], tokens[0] + b"s"):
+                    words.setdefault(word, set()).add(category)
+            elif tokens:
+                pattern = r"[\W_]*".join(re.escape(token.decode("utf-8")) for token in tokens)
+                phrases.setdefault(tokens[0], []).append((category, re.compile(rf"(?<!\w){pattern}s?(?!\w)")))
+    return KeywordIndex({word: frozenset(hit) for word, hit in words.items()},
+                        {first: tuple(entries) for first, entries in phrases.items()})
+
+
+def split_words(text):
+    """The words of lowercased text in order, as UTF-8 bytes, split on whitespace and punctuation."""
+    return text.encode("utf-8").translate(TOKEN_TABLE).split()
+
+
+def tokenize(text):
+    """The set of words (UTF-8 bytes) in lowercased text."""
+    return set(split_words(text))
+
+
+def match_terms(text, index):
+    """
+    The set of categories whose terms occur in lowercased `text`. One tokenizing pass builds the set of
+    words in the text; single-word terms are then dictionary lookups, and a phrase is only searched for
+    when its first word is present.
+    """
+    present = tokenize(text)
+    hits = set()
+    for word in present & index.words.keys():
+        hits |= index.words[word]
+    for first in present & index.phrases.keys():
+        for category, regex in index.phrases[first]:
+            if category not in hits and regex.search(text):
+                hits.add(category)
+    return hits
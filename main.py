@@ -1,62 +1,102 @@
 from email_processor import *
 from email_responder import *
+from async_imap import aiter_recent_recruiter_emails, iter_in_background
+from imap_keywords import mark_message, flush_all_pending
+from parsed_email import ParsedEmail
+from reply_trim import report_trimmed
+from verdict_cache import save_verdicts, report_verdicts
+from near_duplicates import assign_cluster, set_decision, save_clusters, report_duplicates
+from config import KEYWORD_SKIPPED, KEYWORD_REPLIED, KEYWORD_DRAFTED
 from utils import load_json_file, save_json_file
+import argparse
 import datetime
-from email.header import decode_header
 
 SKIPPED_EMAILS = "skipped_emails.json"
 SENT_EMAILS = "sent_emails.json"  # Track sent emails to prevent duplicates
 
 
 
-def decode_subject(subject):
-    """Decodes a MIME/Base64 encoded subject into plain text."""
-    decoded_parts = decode_header(subject)
-    decoded_subject = ""
-
-    for part, encoding in decoded_parts:
-        if isinstance(part, bytes):
-            decoded_subject += part.decode(encoding or "utf-8", errors="ignore")
-        else:
-            decoded_subject += part  # Already a string
-
-    return decoded_subject.strip()
-
-def process_recruiter_emails():
-    """Fetch and process recruiter emails immediately instead of storing them for later."""
+def process_recruiter_emails(emails=None):
+    """
+    Fetch and process recruiter emails immediately instead of storing them for later.
+    `emails` is any iterable of ParsedEmail records or (email_date, sender, subject, body) tuples; defaults to one concurrent scan
+    of every configured mailbox (config.ACCOUNTS). Decisions are also stored on the server as IMAP
+    keywords (config.KEYWORD_*), so handled mail is excluded from later searches on any machine.
+    """
     print("🚀 Starting email processing...")
     
     skipped_emails = load_json_file(SKIPPED_EMAILS)
-    sent_emails = load_json_file(SENT_EMAILS)
 
     # Fetch emails and process them one at a time
-    for email_date, sender, subject, body in fetch_recent_recruiter_emails():
+    if emails is None:
+        emails = fetch_all_mailboxes()
+
+    try:
+        _process_emails(emails, skipped_emails)
+    finally:
+        flush_all_pending()  # Decisions the fetcher didn't get to store, plus archiving of skipped mail
+        model = load_job_model()
+        if model is not None:
+            model.save_if_updated()  # Decisions learned this run
+        save_verdicts(classifier_version())
+        verdicts = report_verdicts()
+        if verdicts:
+            print(f"🗂️ Classifier verdicts: {verdicts}")
+        save_clusters()
+        duplicates = report_duplicates()
+        if duplicates:
+            print(f"🧬 Near-duplicates collapsed: {duplicates}")
+        trimmed = report_trimmed()
+        if trimmed:
+            print(f"✂️ Trimmed quoted replies, signatures and footers: {trimmed}")
+
+def _process_emails(emails, skipped_emails):
+    """Review each email, prompt for a decision and record it."""
+    for item in emails:
+        parsed = item if isinstance(item, ParsedEmail) else ParsedEmail(*item)
+        email_date, sender, subject, body = parsed  # Subject decoded, body cleaned once by the record
         email_id = f"{email_date} - {sender}"
-        subject = decode_subject(subject)
 
         # **Stop displaying permanently skipped emails**
         if email_id in skipped_emails:
             continue  # No log, no processing
 
         # **Prevent sending multiple emails in a row (must be back-and-forth conversation)**
-        if sender in sent_emails and not recruiter_has_replied(sender, email_date):
+        if not recruiter_has_replied(sender, email_date):  # Reads sent_emails.json fresh
             print(f"🔄 Awaiting recruiter response for: {subject} (From: {sender}). Skipping.")
             continue
 
         print(f"\n📩 Processing Email: {email_date.strftime('%Y-%m-%d %H:%M:%S')} - {subject} (From: {sender})")
 
-        if not check_subject_first(subject):
+        if not parsed.subject_is_job:
             print(f"🚫 Ignoring non-job-related email: {subject}")
             continue
 
+        # Full classification before clustering, so newsletters and sales mail never enter the duplicate index
+        if not parsed.is_job:
+            print("ℹ️ Skipping auto-reply: newsletter/marketing/sales detected.")
+            continue
+
+        # Draft once per job: copies of a job description blasted by several recruiters are collapsed
+        cluster = assign_cluster(email_id, subject, sender, parsed.simhash)
+        if cluster is not None and cluster["id"] != email_id:
+            if cluster["decision"] == "skipped":
+                print(f"🧬 Same job as the skipped '{cluster['subject']}' (From: {cluster['sender']}). Skipping permanently.")
+                skipped_emails = record_decision(SKIPPED_EMAILS, email_id, True)
+                mark_message(email_id, KEYWORD_SKIPPED)
+                continue
+            if cluster["decision"] is not None:
+                print(f"🧬 Same job as '{cluster['subject']}' (From: {cluster['sender']}), already drafted. Skipping this copy.")
+                continue
+
         # Step 2: Extract rate and location before generating response
-        rate, location = extract_rate_location(subject, body)
+        rate, location = parsed.rate_location
 
         # Step 3: Generate response only if it’s a valid job email
-        response = generate_response(subject, body, sender)
+        response = generate_response(subject, body, sender, parsed)
 
-        # Skip non-tech recruiter emails
-        if response is None:
+        # Skip non-tech recruiter emails ("" means do not send)
+        if not response:
             continue
 
         print("\n=========================")
@@ -68,26 +108,52 @@ def process_recruiter_emails():
         print("\n💬 Generated Response:\n")
         print(response)
         print("\n=========================")
+        mark_message(email_id, KEYWORD_DRAFTED)
+        set_decision(cluster, email_id, "drafted")
 
         # Prompt for response options immediately
         user_input = input("✅ Send this response? (Y/N/S/M): ").strip().lower()
         if user_input == "y":
             send_email(sender, "Re: " + subject, response, attach_resume=True)
-            sent_emails[sender] = email_date.strftime('%Y-%m-%d %H:%M:%S')  # Convert datetime to string
-            save_json_file(SENT_EMAILS, sent_emails)
+            record_decision(SENT_EMAILS, sender, email_date.strftime('%Y-%m-%d %H:%M:%S'))
+            mark_message(email_id, KEYWORD_REPLIED)
+            learn_decision(parsed, 1)
+            set_decision(cluster, email_id, "replied")
         elif user_input == "m":
             manual_response = input("✍️ Enter your custom response: ")
             send_email(sender, "Re: " + subject, manual_response, attach_resume=True)
-            sent_emails[sender] = email_date.strftime('%Y-%m-%d %H:%M:%S')  # Convert datetime to string
-            save_json_file(SENT_EMAILS, sent_emails)
+            record_decision(SENT_EMAILS, sender, email_date.strftime('%Y-%m-%d %H:%M:%S'))
+            mark_message(email_id, KEYWORD_REPLIED)
+            learn_decision(parsed, 1)
+            set_decision(cluster, email_id, "replied")
         elif user_input == "n":
             print("🚫 Email permanently skipped.")
-            skipped_emails[email_id] = True
-            save_json_file(SKIPPED_EMAILS, skipped_emails)
+            skipped_emails = record_decision(SKIPPED_EMAILS, email_id, True)
+            mark_message(email_id, KEYWORD_SKIPPED)
+            learn_decision(parsed, 0)
+            set_decision(cluster, email_id, "skipped")  # Later copies of this job are skipped too
         elif user_input == "s":
             print("⏳ Skipping this email temporarily.")
+            defer_message(email_id)  # Fetched again next run, although below the incremental mark
         else:
             print("❌ Invalid input. Email skipped.")
+            defer_message(email_id)
+
+def record_decision(filename, key, value):
+    """
+    Re-read a state file, set one entry and save it. The fetcher updates the same files while
+    we're prompting (noreply skips, flag sync), so a copy loaded at startup must not be written back.
+    """
+    data = load_json_file(filename)
+    data[key] = value
+    save_json_file(filename, data)
+    return data
+
+def learn_decision(parsed, label):
+    """Feed a send (1) or permanent skip (0) to the learned classifier when CLASSIFIER=model."""
+    model = load_job_model()
+    if model is not None:
+        model.learn(parsed.blob, parsed.sender.lower(), label)
 
 def recruiter_has_replied(sender, current_email_date):
     """Checks if a recruiter has replied since the last response."""
@@ -105,4 +171,21 @@ def recruiter_has_replied(sender, current_email_date):
     return current_email_date > last_sent_date
 
 if __name__ == "__main__":
-    process_recruiter_emails()
+    parser = argparse.ArgumentParser(description="Process recruiter emails from the inbox.")
+    parser.add_argument("--idle", action="store_true",
+                        help="stay connected and process new mail as it arrives (IMAP IDLE)")
+    parser.add_argument("--offline", action="store_true",
+                        help="reprocess mail from the local message cache without connecting")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="fetch with the pipelined asyncio reader while replies are being drafted "
+                             "(no retries or reconnects: a dropped connection ends the scan)")
+    args = parser.parse_args()
+
+    if args.idle:
+        process_recruiter_emails(watch_recruiter_emails())
+    elif args.offline:
+        process_recruiter_emails(replay_cached_emails())
+    elif args.use_async:
+        process_recruiter_emails(iter_in_background(aiter_recent_recruiter_emails))
+    else:
+        process_recruiter_emails()
@@ -0,0 +1,114 @@
+import gzip
+import os
+import re
+import time
+from config import EMAIL_CACHE, EMAIL_CACHE_MAX_MB, EMAIL_CACHE_MAX_AGE_DAYS
+
+
+class MessageCache:
+    """
+    On-disk raw message store: one gzip file per message at <root>/<mailbox>/<uidvalidity>/<uid>.eml.gz.
+    A (mailbox, UIDVALIDITY, UID) triple always names the same immutable bytes on an IMAP server, so
+    entries never need revalidation. Reads refresh the file's mtime, which drives LRU eviction.
+    """
+
+    def __init__(self, root=EMAIL_CACHE, max_mb=EMAIL_CACHE_MAX_MB, max_age_days=EMAIL_CACHE_MAX_AGE_DAYS):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _safe_name(mailbox_key):
+        return re.sub(r"[^A-Za-z0-9._@-]", "_", mailbox_key)
+
+    def mailbox_dir(self, mailbox_key, uidvalidity):
+        return os.path.join(self.root, self._safe_name(mailbox_key), str(uidvalidity))
+
+    def path(self, mailbox_key, uidvalidity, uid):
+        return os.path.join(self.mailbox_dir(mailbox_key, uidvalidity), f"{uid}.eml.gz")
+
+    def get(self, mailbox_key, uidvalidity, uid):
+        """Return the cached raw message, or None."""
+        path = self.path(mailbox_key, uidvalidity, uid)
+        try:
+            with gzip.open(path, "rb") as file:
+                raw_message = file.read()
+        except (OSError, EOFError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return raw_message
+
+    def put(self, mailbox_key, uidvalidity, uid, raw_message):
+        """Store a raw message atomically (write to a temp file, then rename)."""
+        path = self.path(mailbox_key, uidvalidity, uid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as file:
+            file.write(raw_message)
+        os.replace(tmp_path, path)
+
+    def iter_mailbox(self, mailbox_key):
+        """Yield (uidvalidity, uid, raw_message) for every cached message of a mailbox, newest UID first."""
+        base = os.path.join(self.root, self._safe_name(mailbox_key))
+        if not os.path.isdir(base):
+            return
+        # Newest UIDVALIDITY first, compared as numbers ("9" < "10"); anything else in the directory is ignored
+        for uidvalidity in sorted((name for name in os.listdir(base) if name.isdigit()), key=int, reverse=True):
+            folder = os.path.join(base, uidvalidity)
+            uids = sorted((int(name.split(".")[0]) for name in os.listdir(folder) if name.endswith(".eml.gz")),
+                          reverse=True)
+            for uid in uids:
+                raw_message = self.get(mailbox_key, uidvalidity, uid)
+                if raw_message is not None:
+                    yield int(uidvalidity), uid, raw_message
+
+    def iter_all(self):
+        """Yield (uidvalidity, uid, raw_message) for every cached message of every mailbox."""
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            if os.path.isdir(os.path.join(self.root, name)):
+                yield from self.iter_mailbox(name)  # Directory names are already safe mailbox keys
+
+    def evict(self):
+        """
+        Drop entries older than the age limit, then the least recently used ones until the cache
+        fits its size budget. Returns the number of files removed.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+
+        entries = []
+        for folder, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):  # Oldest first
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def report(self):
+        """One-line hit/miss summary."""
+        return f"hits={self.hits} misses={self.misses}"
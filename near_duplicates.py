@@ -0,0 +1,103 @@
+import hashlib
+import time
+from collections import Counter
+from config import (
+    NEAR_DUPLICATES, NEAR_DUPLICATE_INDEX, NEAR_DUPLICATE_MAX_DISTANCE, NEAR_DUPLICATE_MIN_WORDS,
+    NEAR_DUPLICATE_HISTORY_DAYS,
+)
+from keyword_matcher import split_words
+from utils import load_json_file, save_json_file
+
+SHINGLE_WORDS = 3  # Fingerprint features are runs of this many consecutive words
+
+# Recent jobs, one cluster per distinct body: {"id": email_id of the first copy, "simhash", "subject",
+# "sender", "copies" (seen besides the first), "last_seen" (epoch seconds), "decision": None | "drafted" | "replied" | "skipped"}
+_clusters = None
+_changed = False
+duplicate_stats = Counter()  # copies, jobs since the last report
+
+
+def simhash(text):
+    """
+    64-bit SimHash of lowercased text over its word shingles, or None when the text has fewer than
+    NEAR_DUPLICATE_MIN_WORDS words. Bodies that differ in a greeting or signature differ in a few bits.
+    """
+    words = split_words(text)
+    if len(words) < NEAR_DUPLICATE_MIN_WORDS:
+        return None
+    shingles = {b" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    # Majority vote per bit; transposing the binary strings keeps the counting in C
+    hashes = (f"{int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'big'):064b}" for shingle in shingles)
+    fingerprint = 0
+    for column in zip(*hashes):
+        fingerprint = (fingerprint << 1) | (column.count("1") * 2 > len(shingles))
+    return fingerprint
+
+
+def _load():
+    global _clusters
+    if _clusters is None:
+        _clusters = load_json_file(NEAR_DUPLICATE_INDEX).get("clusters", [])
+    return _clusters
+
+
+def assign_cluster(email_id, subject, sender, fingerprint):
+    """
+    Put a message into the cluster of its job: the recent cluster with the closest fingerprint within
+    NEAR_DUPLICATE_MAX_DISTANCE bits, else a new one. Returns the cluster (a dict; the message is its
+    representative when cluster["id"] == email_id), or None when disabled or the body is too short.
+    """
+    global _changed
+    if not NEAR_DUPLICATES or fingerprint is None:
+        return None
+    clusters = _load()
+    best, best_distance = None, NEAR_DUPLICATE_MAX_DISTANCE + 1
+    for cluster in clusters:
+        distance = (cluster["simhash"] ^ fingerprint).bit_count()
+        if distance < best_distance:
+            best, best_distance = cluster, distance
+
+    _changed = True
+    if best is None:
+        best = {"id": email_id, "simhash": fingerprint, "subject": subject, "sender": sender,
+                "copies": 0, "last_seen": 0, "decision": None}
+        clusters.append(best)
+        duplicate_stats["jobs"] += 1
+    elif best["id"] != email_id:
+        best["copies"] += 1
+        duplicate_stats["copies"] += 1
+    best["last_seen"] = time.time()
+    return best
+
+
+def set_decision(cluster, email_id, decision):
+    """
+    Record a decision ("drafted", "replied" or "skipped") on a cluster's message; that message becomes the
+    cluster's representative, so a later run shows it again while its copies stay collapsed.
+    """
+    global _changed
+    if cluster is not None:
+        cluster["id"] = email_id
+        cluster["decision"] = decision
+        _changed = True
+
+
+def save_clusters():
+    """Write the clusters seen within NEAR_DUPLICATE_HISTORY_DAYS, if anything changed this run."""
+    global _clusters, _changed
+    if not _changed:
+        return
+    oldest = time.time() - NEAR_DUPLICATE_HISTORY_DAYS * 24 * 3600
+    _clusters = [cluster for cluster in _load() if cluster["last_seen"] >= oldest]
+    save_json_file(NEAR_DUPLICATE_INDEX, {"clusters": _clusters})
+    _changed = False
+
+
+def report_duplicates():
+    """One-line summary since the last call (then reset), or "" when no copies were collapsed."""
+    if not duplicate_stats["copies"]:
+        duplicate_stats.clear()
+        return ""
+    summary = f"{duplicate_stats['copies']} copies of already seen jobs, {duplicate_stats['jobs']} new jobs"
+    duplicate_stats.clear()
+    return summary
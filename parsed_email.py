@@ -0,0 +1,159 @@
+from email.header import decode_header
+from email.utils import parseaddr
+from email_responder import (
+    check_subject_first, classify_text, classifier_version, extract_rate_location_text, log_classification,
+)
+from html_text import html_to_text, plain_to_text
+from reply_trim import trim_reply
+from verdict_cache import verdict_key, get_verdict, put_verdict
+from near_duplicates import simhash
+
+UNSET = object()  # Cache slot not computed yet (for fields whose value may be None)
+
+
+def decode_subject(subject):
+    """Decodes a MIME/Base64 encoded subject into plain text."""
+    if subject is None:
+        return ""
+    decoded_parts = decode_header(subject)
+    decoded_subject = ""
+
+    for part, encoding in decoded_parts:
+        if isinstance(part, bytes):
+            try:
+                decoded_subject += part.decode(encoding or "utf-8", errors="ignore")
+            except LookupError:  # Unknown charset name
+                decoded_subject += part.decode("utf-8", errors="ignore")
+        else:
+            decoded_subject += part  # Already a string
+
+    return decoded_subject.strip()
+
+
+class ParsedEmail:
+    """
+    One message as every stage sees it: built once by the fetcher, then read by the classifier,
+    the rate/location extraction and the prompt. Derived fields (cleaned body, lowercase blob,
+    verdicts, rate/location) are computed on first use and cached, so the HTML is cleaned, trimmed
+    and lowercased once per message.
+    Unpacks like the old (email_date, sender, subject, body) tuple, body being the cleaned text.
+    """
+    __slots__ = ("uid", "message_id", "email_date", "sender", "subject", "raw_body", "is_html",
+                 "_body", "_trimmed_body", "_trimmed_lower", "_sender_address", "_blob",
+                 "_subject_is_job", "_classification", "_rate_location", "_simhash")
+
+    def __init__(self, email_date, sender, subject, raw_body, uid=None, message_id=None, is_html=True,
+                 subject_is_job=None):
+        self.uid = uid
+        self.message_id = (message_id or "").strip() or None
+        self.email_date = email_date
+        self.sender = sender or ""
+        self.subject = decode_subject(subject)
+        self.raw_body = raw_body or ""
+        self.is_html = is_html  # False for a text/plain body, which needs no HTML stripping
+        self._body = None
+        self._trimmed_body = None
+        self._trimmed_lower = None
+        self._sender_address = None
+        self._blob = None
+        # The header prefilter already ran check_subject_first on the subject; the fetcher passes its verdict on
+        self._subject_is_job = subject_is_job
+        self._classification = None
+        self._rate_location = None
+        self._simhash = UNSET
+
+    @property
+    def body(self):
+        """The body as readable text (html_to_text of raw_body, or plain_to_text for a text/plain body)."""
+        if self._body is None:
+            self._body = html_to_text(self.raw_body) if self.is_html else plain_to_text(self.raw_body)
+        return self._body
+
+    @property
+    def trimmed_body(self):
+        """body without quoted reply history, signature and footers (reply_trim.trim_reply)."""
+        if self._trimmed_body is None:
+            self._trimmed_body = trim_reply(self.body)
+        return self._trimmed_body
+
+    @property
+    def sender_address(self):
+        """The bare, lowercased From address."""
+        if self._sender_address is None:
+            self._sender_address = parseaddr(self.sender)[1].lower()
+        return self._sender_address
+
+    @property
+    def blob(self):
+        """Lowercased "subject sender body" text the classifier scores."""
+        if self._blob is None:
+            self._blob = " ".join([self.subject.lower(), self.sender.lower(), self._lower_trimmed_body()])
+        return self._blob
+
+    @property
+    def subject_is_job(self):
+        """check_subject_first on the subject alone."""
+        if self._subject_is_job is None:
+            self._subject_is_job = check_subject_first(self.subject)
+        return self._subject_is_job
+
+    @property
+    def verdict_key(self):
+        """verdict_cache key: the Message-ID, else a hash of sender, subject and raw body."""
+        return verdict_key(self.message_id, self.sender, self.subject, self.raw_body)
+
+    @property
+    def classification(self):
+        """
+        (is_job, score, reasons) from the full subject/sender/body classifier. A verdict cached for this
+        message under the current ruleset is reused without cleaning or scoring the body at all.
+        """
+        if self._classification is None:
+            version = classifier_version()
+            key = self.verdict_key if version is not None else None
+            cached = get_verdict(key, version) if key else None
+            if cached is not None:
+                self._classification = cached
+                log_classification(*cached, cached=True)
+            else:
+                self._classification = classify_text(self.blob, self.sender.lower())
+                log_classification(*self._classification)
+                if key:
+                    put_verdict(key, version, self._classification)
+        return self._classification
+
+    @property
+    def is_job(self):
+        return self.classification[0]
+
+    @property
+    def rate_location(self):
+        """(rate, location) as returned by extract_rate_location."""
+        if self._rate_location is None:
+            text = f"{self.subject.lower()} \n {self._lower_trimmed_body()}"
+            self._rate_location = extract_rate_location_text(text, self.trimmed_body)
+        return self._rate_location
+
+    @property
+    def simhash(self):
+        """near_duplicates fingerprint of the trimmed body (None when it is too short to fingerprint)."""
+        if self._simhash is UNSET:
+            self._simhash = simhash(self._lower_trimmed_body())
+        return self._simhash
+
+    def _lower_trimmed_body(self):
+        if self._trimmed_lower is None:
+            self._trimmed_lower = self.trimmed_body.lower()
+        return self._trimmed_lower
+
+    def __iter__(self):
+        return iter((self.email_date, self.sender, self.subject, self.body))
+
+    def __getitem__(self, index):
+        return (self.email_date, self.sender, self.subject, self.body)[index]
+
+    def __len__(self):
+        return 4
+
+    def __repr__(self):
+        return f"ParsedEmail(uid={self.uid!r}, date={self.email_date!r}, sender={self.sender!r}, subject={self.subject!r})"
@@ -0,0 +1,82 @@
+import re
+from collections import Counter
+from config import TRIM_REPLIES
+
+# Where the rest of a message stops being the sender's own words: the quoted history of a reply
+# ("On <date> <name> wrote:", which clients may wrap onto a second line; Outlook's "Original Message"
+# and underscore separators or its From:/Sent: block) or a confidentiality/legal footer.
+# Forwarded messages are kept: recruiters often forward the job description itself.
+CUT_RE = re.compile(
+    r"^(?:"
+    r"On\b[^\n]{0,200}(?:\n[^\n]{0,200})?\bwrote:[ \t]*$"
+    r"|-{2,}[ \t]*Original Message[ \t]*-{2,}"
+    r"|_{10,}[ \t]*$"
+    r"|From:[^\n]*\n(?:Sent|Date):"
+    r"|(?:\*+[ \t]*)?(?:CONFIDENTIALITY NOTICE|(?-i:CONFIDENTIAL(?:ITY)?:)|DISCLAIMER:|Legal Disclaimer)"
+    r"|(?:This|The information (?:contained )?in this) (?:e-?mail|message|communication)\b[^\n]{0,120}"
+    r"\b(?:privileged|intended (?:solely|only) for)"  # Legal wording only: "a confidential client" is a job detail
+    r")",
+    re.MULTILINE | re.IGNORECASE,
+)
+# A forward's own header block (From:/Date: right under this marker) is the start of the forwarded text, not a cut
+FORWARD_MARKER_RE = re.compile(r"-{2,}[ \t]*Forwarded message[ \t]*-{2,}|Begin forwarded message:", re.IGNORECASE)
+QUOTED_LINE_RE = re.compile(r"^[ \t]*>[^\n]*\n?", re.MULTILINE)
+# RFC 3676 "-- " delimiter (collapse_whitespace keeps its trailing space); a bare "--" is often a list separator
+SIGNATURE_RE = re.compile(r"^-- $|^Sent from my [^\n]{1,40}$", re.MULTILINE)
+SIGNATURE_MAX_LINES = 15  # A "-- " line further from the end than this is content, not a signature
+
+trim_stats = Counter()  # messages, trimmed, bytes_in, bytes_saved since the last report
+
+
+def trim_reply(text):
+    """
+    Drop quoted reply history, "> " lines, a trailing signature and confidentiality footers from
+    cleaned body text, so the classifier and the LLM prompt only see the new message.
+    Falls back to the untouched text if trimming would leave nothing. Savings go to trim_stats.
+    """
+    if not text or not TRIM_REPLIES:
+        return text
+    trimmed = text
+    cut = _find_cut(trimmed)
+    if cut:
+        trimmed = trimmed[:cut.start()]
+    if ">" in trimmed:
+        trimmed = QUOTED_LINE_RE.sub("", trimmed)
+    for signature in reversed(list(SIGNATURE_RE.finditer(trimmed))):
+        if trimmed.count("\n", signature.end()) <= SIGNATURE_MAX_LINES:
+            trimmed = trimmed[:signature.start()]
+        break
+    trimmed = trimmed.strip() or text
+
+    trim_stats["messages"] += 1
+    if len(trimmed) < len(text):
+        bytes_in = len(text.encode("utf-8"))
+        trim_stats["trimmed"] += 1
+        trim_stats["bytes_in"] += bytes_in
+        trim_stats["bytes_saved"] += bytes_in - len(trimmed.encode("utf-8"))
+    return trimmed
+
+
+def _find_cut(text):
+    """
+    The first CUT_RE match that marks the end of the new message, or None. A message that *starts* with a
+    quote header is all quote and is kept, and so is the header block of a forwarded message.
+    """
+    for cut in CUT_RE.finditer(text, 1):
+        if cut.group()[:5].lower() == "from:":
+            previous_line = text[:cut.start()].rstrip().rpartition("\n")[2].strip()
+            if FORWARD_MARKER_RE.fullmatch(previous_line):
+                continue
+        return cut
+    return None
+
+
+def report_trimmed():
+    """One-line summary of the trimming since the last call (then reset), or "" when nothing was cut."""
+    if not trim_stats["trimmed"]:
+        trim_stats.clear()
+        return ""
+    summary = (f"{trim_stats['trimmed']}/{trim_stats['messages']} messages, "
+               f"{trim_stats['bytes_saved']:,} of {trim_stats['bytes_in']:,} bytes saved")
+    trim_stats.clear()
+    return summary
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from email.message import Message
+from email.parser import BytesFeedParser
+import pytest
+from async_imap import AsyncImapClient, AsyncImapError
+
+
+class ScriptedWriter:
+    """Answers each command written to it with the next canned server response."""
+
+    def __init__(self, reader, responses):
+        self.reader = reader
+        self.responses = list(responses)
+
+    def write(self, data):
+        self.reader.feed_data(self.responses.pop(0))
+
+    async def drain(self):
+        pass
+
+
+def fetch_with_reply(reply):
+    async def run():
+        client = AsyncImapClient("imap.example.com")
+        client.reader = asyncio.StreamReader()
+        client.writer = ScriptedWriter(client.reader, [reply])
+        client._reader_task = asyncio.create_task(client._read_loop())
+        try:
+            return await client.uid_fetch([7], "(UID BODY.PEEK[1])", parser_for=lambda uid: BytesFeedParser(),
+                                          section="BODY[1]")
+        finally:
+            client._reader_task.cancel()
+    return asyncio.run(run())
+
+
+def test_section_literal_is_parsed_when_uid_comes_first():
+    items = fetch_with_reply(b"* 3 FETCH (UID 7 BODY[1]<0> {19}\r\nSubject: x\r\n\r\nthere)\r\nA0001 OK done\r\n")
+    message = items[0]["BODY[1]<0>"]
+    assert isinstance(message, Message)
+    assert message["Subject"] == "x" and message.get_payload() == "there"
+
+
+def test_section_literal_is_parsed_when_uid_comes_after():
+    items = fetch_with_reply(b"* 3 FETCH (BODY[1]<0> {19}\r\nSubject: x\r\n\r\nthere UID 7)\r\nA0001 OK done\r\n")
+    assert items[0]["UID"] == 7
+    message = items[0]["BODY[1]<0>"]
+    assert isinstance(message, Message)
+    assert message["Subject"] == "x" and message.get_payload() == "there"
+
+
+def run_command(reply, timeout=5, **fetch_args):
+    async def run():
+        client = AsyncImapClient("imap.example.com", timeout=timeout)
+        client.reader = asyncio.StreamReader()
+        client.writer = ScriptedWriter(client.reader, [reply])
+        client._reader_task = asyncio.create_task(client._read_loop())
+        try:
+            return await asyncio.wait_for(client.uid_fetch([7], "(UID BODY.PEEK[1])", **fetch_args), 10)
+        finally:
+            client._reader_task.cancel()
+    return asyncio.run(run())
+
+
+def test_reader_failure_fails_the_waiting_command():
+    def broken_parser(uid):
+        raise KeyError(uid)
+
+    with pytest.raises(AsyncImapError) as error:
+        run_command(b"* 3 FETCH (UID 7 BODY[1]<0> {5}\r\nthere)\r\nA0001 OK done\r\n",
+                    parser_for=broken_parser, section="BODY[1]")
+    assert isinstance(error.value.__cause__, KeyError)
+
+
+def test_silent_server_times_out():
+    started = time.monotonic()
+    with pytest.raises(AsyncImapError, match="No response"):
+        run_command(b"", timeout=0.2)
+    assert time.monotonic() - started < 2
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("numpy")
+from batch_classifier import classify_batch, reasons_for
+from email_responder import classify_text
+from parsed_email import ParsedEmail
+
+EMAILS = [
+    ("Mon, 5 Oct 2026 10:00:00 +0000", "Jane <jane@staffing.example>", "Python contract role",
+     "<p>Hi, I am a recruiter with a $90/hr C2C contract, remote.</p>"),
+    ("Mon, 5 Oct 2026 10:00:00 +0000", "Deals <newsletter@store.example>", "Weekend sale",
+     "<p>Huge discount today. Unsubscribe | Privacy Policy</p>"),
+    ("Mon, 5 Oct 2026 10:00:00 +0000", "Solar <hello@solar.example>", "Your roof",
+     "Get a quote for solar panels and lower your utility bill."),
+    ("Mon, 5 Oct 2026 10:00:00 +0000", "Bob <bob@example.com>", "Lunch?", "Are you free on Friday?"),
+]
+
+
+def test_batch_scores_match_classify_text():
+    records = [ParsedEmail(*item) for item in EMAILS]
+    verdicts = classify_batch(records)
+    for row, parsed in enumerate(records):
+        is_job, score, reasons = classify_text(parsed.blob, parsed.sender.lower(), use_model=False)
+        assert bool(verdicts.is_job[row]) == is_job
+        assert int(verdicts.scores[row]) == score
+        assert reasons_for(verdicts.hits[row]) == reasons
+    assert [bool(v) for v in verdicts.is_job] == [True, False, False, False]
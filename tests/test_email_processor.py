@@ -0,0 +1,166 @@
+import datetime
+import socket
+import threading
+import time
+import email
+from email.message import EmailMessage
+from email.utils import format_datetime
+import email_processor
+from email_processor import iter_chunk_messages, mailbox_state_key
+from message_cache import MessageCache
+from utils import ProgressReporter
+
+
+class RecordingSession:
+    """Just enough of ImapSession for iter_chunk_messages; records every UID command sent."""
+    folder, server, address, password = "inbox", "imap.example.com", "me@example.com", "secret"
+    max_retries = 0
+
+    def __init__(self):
+        self.select_info = {"uidvalidity": 7, "permanentflags": ()}
+        self.commands = []
+        self.retries = self.reconnects = self.dropped = 0
+
+    def uid(self, command, *args):
+        self.commands.append((command, *args))
+        raise AssertionError(f"unexpected UID {command}")
+
+    def record_drop(self, count):
+        self.dropped += count
+
+
+def raw_message(uid, subject, body, date):
+    return (f"From: Recruiter <jane@staffing.example>\r\nSubject: {subject}\r\nDate: {format_datetime(date)}\r\n"
+            f"Message-ID: <{uid}@staffing.example>\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n{body}\r\n").encode()
+
+
+def test_cached_messages_are_served_without_fetch(tmp_path):
+    session = RecordingSession()
+    cache = MessageCache(root=str(tmp_path))
+    key = mailbox_state_key(session.folder, session.server, session.address)
+    now = datetime.datetime.now().astimezone()
+    for uid in (12, 11):
+        cache.put(key, 7, uid, raw_message(uid, f"Python Developer contract role {uid}", "Remote, $90/hr.", now))
+
+    start = datetime.datetime.now() - datetime.timedelta(days=1)
+    end = datetime.datetime.now() + datetime.timedelta(days=1)
+    parsed = list(iter_chunk_messages(session, [12, 11], start, end, {}, cache))
+
+    assert [record.uid for record in parsed] == [12, 11]
+    assert "$90/hr" in parsed[0].body
+    assert session.commands == []
+
+
+class UnreachableSession:
+    """ImapSession stand-in for workers whose connection always fails."""
+
+    def __init__(self, *args, **kwargs):
+        self.retries = self.reconnects = self.dropped = 0
+        self.select_info = {}
+
+    def call(self, name, *args):
+        raise ConnectionRefusedError("connection refused")
+
+    def close(self):
+        pass
+
+
+def test_parallel_chunks_are_dropped_when_workers_cannot_connect(monkeypatch):
+    monkeypatch.setattr(email_processor, "ImapSession", UnreachableSession)
+    session = RecordingSession()
+    messages = list(email_processor._iter_parallel(session, [[5, 4], [3, 2, 1]], 2, None, None, {},
+                                                   ProgressReporter(5, "Fetching")))
+    assert messages == []
+    assert session.dropped == 5
+
+
+class SocketMail:
+    """The parts of imaplib.IMAP4 idle_wait drives, over one end of a socket pair."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def readline(self):
+        return self.file.readline()
+
+
+def test_idle_sees_update_that_arrived_with_the_continuation():
+    client, server = socket.socketpair()
+    server.settimeout(5)
+
+    def serve():
+        tag = server.makefile("rb").readline().split()[0]
+        server.sendall(b"+ idling\r\n* 3 EXISTS\r\n")  # One segment: the EXISTS line is buffered with "+"
+        server.recv(64)  # DONE
+        server.sendall(tag + b" OK IDLE terminated\r\n")
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    started = time.monotonic()
+    try:
+        assert email_processor.idle_wait(SocketMail(client), timeout=5) is True
+    finally:
+        thread.join()
+        client.close()
+        server.close()
+    assert time.monotonic() - started < 2
+
+
+class FullDiskCache(MessageCache):
+    def put(self, mailbox_key, uidvalidity, uid, raw_message):
+        raise OSError(28, "No space left on device")
+
+
+def test_unwritable_cache_does_not_lose_messages(tmp_path, monkeypatch):
+    now = datetime.datetime.now().astimezone()
+    survivor = (now.replace(tzinfo=None), "Recruiter <jane@staffing.example>", "Python Developer contract role")
+    monkeypatch.setattr(email_processor, "fetch_header_candidates", lambda *args: ({5: survivor}, {}, {}))
+    monkeypatch.setattr(email_processor, "fetch_message_bodies",
+                        lambda *args: {5: raw_message(5, survivor[2], "Remote, $90/hr.", now)})
+
+    parsed = list(iter_chunk_messages(RecordingSession(), [5], None, None, {}, FullDiskCache(root=str(tmp_path))))
+    assert [record.uid for record in parsed] == [5]
+
+
+def test_seven_bit_charsets_are_decoded():
+    body = "東京の案件です。リモート可。".encode("iso-2022-jp")
+    assert body.isascii()
+    message = email.message_from_bytes(b"Content-Type: text/plain; charset=iso-2022-jp\r\n"
+                                       b"Content-Transfer-Encoding: 7bit\r\n\r\n" + body)
+    assert email_processor.decode_payload(message) == "東京の案件です。リモート可。"
+
+
+def test_ascii_payload_takes_the_fast_path():
+    message = EmailMessage()
+    message.set_content("Python contract, remote.", charset="utf-8")
+    assert email_processor.decode_payload(message).strip() == "Python contract, remote."
+
+
+def test_mail_skipped_for_now_is_fetched_again(tmp_path, monkeypatch):
+    from imap_keywords import remember_location
+    monkeypatch.setattr(email_processor, "IMAP_SYNC_STATE", str(tmp_path / "sync.json"))
+    monkeypatch.setattr(email_processor, "_deferred_this_run", {})
+    state_key = mailbox_state_key("INBOX", "imap.x.com", "me@x.com")
+    email_processor.save_mailbox_state(state_key, {"uidvalidity": 7, "last_uid": 10})
+    remember_location("deferred-id", ("imap.x.com", "me@x.com", "INBOX"), 4)
+    email_processor.defer_message("deferred-id")
+
+    state = email_processor.load_json_file(str(tmp_path / "sync.json"))[state_key]
+    assert state["deferred"] == [4]
+    criteria, last_uid = email_processor.incremental_search_criteria(
+        ["SINCE", "01-Jan-2026"], state, {"uidvalidity": 7, "uidnext": 11})
+    assert criteria[:2] == ["UID", "4,11:*"]
+    uids = email_processor.parse_search_uids([b"4 10"], last_uid, state["deferred"])
+    assert uids == [4]
+    assert email_processor.next_high_water_mark(state, 7, uids) == 10
+
+    # Deferred again before the scan finished: it must survive the scan's clean-up
+    email_processor.save_mailbox_state(state_key, {"uidvalidity": 7, "last_uid": 10}, undeferred=[4])
+    assert email_processor.load_json_file(str(tmp_path / "sync.json"))[state_key]["deferred"] == [4]
+    monkeypatch.setattr(email_processor, "_deferred_this_run", {})
+    email_processor.save_mailbox_state(state_key, {"uidvalidity": 7, "last_uid": 10}, undeferred=[4])
+    assert email_processor.load_json_file(str(tmp_path / "sync.json"))[state_key]["deferred"] == []
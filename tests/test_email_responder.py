@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+import email_responder
+from email_responder import RULESET_VERSION, classifier_version, classify_text
+
+
+def test_rule_verdicts_are_versioned_until_the_model_is_usable(monkeypatch):
+    monkeypatch.setattr(email_responder, "load_job_model", lambda: None)
+    assert classifier_version() == RULESET_VERSION
+
+    untrained = SimpleNamespace(usable_model=lambda: None)
+    monkeypatch.setattr(email_responder, "load_job_model", lambda: untrained)
+    assert classifier_version() == RULESET_VERSION
+
+    trained = SimpleNamespace(usable_model=lambda: object())
+    monkeypatch.setattr(email_responder, "load_job_model", lambda: trained)
+    assert classifier_version() is None
+
+
+def test_classify_text_scores_cue_weights():
+    is_job, score, reasons = classify_text("python contract role $90/hr with a recruiter", "jane@staffing.example",
+                                           use_model=False)
+    assert is_job and score == 5
+    assert reasons == ["strong recruiter cue", "job terms", "rate w/ hr"]
+    is_job, score, _ = classify_text("job alert: recommended jobs", "alerts@indeed.com", use_model=False)
+    assert not is_job and score < 0
@@ -0,0 +1,31 @@
+from html_text import html_to_text, plain_to_text
+
+
+def test_table_cells_stay_separate_words():
+    assert html_to_text("<table><tr><td>Type</td><td>Contract</td></tr></table>") == "Type Contract"
+    assert html_to_text("<tr><th>Rate</th><th>Location</th></tr><tr><td>$90/hr</td><td>Remote</td></tr>") == (
+        "Rate Location\n$90/hr Remote")
+
+
+def test_inline_tags_separate_words():
+    assert html_to_text('<span>Senior</span><span>Engineer</span>') == "Senior Engineer"
+    assert html_to_text('Hello<img src="logo.png">World') == "Hello World"
+    assert html_to_text("<b>Python</b> <i>developer</i>") == "Python developer"
+
+
+def test_block_tags_become_line_breaks():
+    assert html_to_text("<p>First</p><p>Second</p>Third<br>Fourth") == "First\nSecond\nThird\nFourth"
+
+
+def test_hidden_elements_and_comments_are_dropped():
+    raw = "<head><title>Ignored</title><style>p {}</style></head><!-- note --><p>Visible</p><script>x()</script>"
+    assert html_to_text(raw) == "Visible"
+
+
+def test_entities_are_decoded_and_stray_angle_brackets_kept():
+    assert html_to_text("R&amp;D role, a < b &gt; c") == "R&D role, a < b > c"
+
+
+def test_max_chars_caps_output():
+    assert len(html_to_text("<p>" + "word " * 100 + "</p>", max_chars=10)) == 10
+    assert plain_to_text("a  b\n\n\nc", max_chars=0) == "a b\nc"
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+import pytest
+import imap_keywords
+from config import KEYWORD_REPLIED
+
+
+class FakeSession:
+    opened = []
+
+    def __init__(self, folder, server, address, password):
+        self.folder, self.server, self.address, self.password = folder, server, address, password
+        self.select_info = {"permanentflags": ("\\*",)}
+        self.stored = []
+        FakeSession.opened.append(self)
+
+    def call(self, name, *args):
+        pass
+
+    def uid(self, command, *args):
+        self.stored.append((command, *args))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def empty_queues(monkeypatch):
+    monkeypatch.setattr(imap_keywords, "IMAP_KEYWORDS", True)
+    monkeypatch.setattr(imap_keywords, "ARCHIVE_SKIPPED", False)
+    for name in ("_locations", "_pending", "_archive", "_credentials"):
+        monkeypatch.setattr(imap_keywords, name, {})
+    monkeypatch.setattr(imap_keywords, "ImapSession", FakeSession)
+    FakeSession.opened = []
+
+
+def test_queue_keys_hold_no_password_but_flush_can_reconnect():
+    session = SimpleNamespace(folder="INBOX", server="imap.example.com", address="me@example.com", password="s3cret")
+    mailbox = imap_keywords.session_mailbox(session)
+    imap_keywords.remember_location("2026-10-05 10:00:00 - jane@example.com", mailbox, 42)
+    imap_keywords.mark_message("2026-10-05 10:00:00 - jane@example.com", KEYWORD_REPLIED)
+
+    assert list(imap_keywords._pending) == [("imap.example.com", "me@example.com", "INBOX")]
+    assert "s3cret" not in repr((imap_keywords._pending, imap_keywords._locations))
+
+    imap_keywords.flush_all_pending()
+    [flush] = FakeSession.opened
+    assert (flush.folder, flush.server, flush.address, flush.password) == (
+        "INBOX", "imap.example.com", "me@example.com", "s3cret")
+    assert flush.stored == [("STORE", "42", "+FLAGS.SILENT", f"({KEYWORD_REPLIED})")]
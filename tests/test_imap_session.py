@@ -0,0 +1,68 @@
+import imaplib
+from imap_session import ImapSession, compress_uid_set, parse_uid_set, quote_string
+
+
+def test_compress_uid_set_builds_ranges():
+    assert compress_uid_set([7, 1, 2, 3, 3]) == "1:3,7"
+    assert compress_uid_set([5]) == "5"
+    assert compress_uid_set([]) == ""
+
+
+def test_parse_uid_set_expands_ranges():
+    assert parse_uid_set("1:3,7") == {1, 2, 3, 7}
+    assert parse_uid_set("9:7, ,12") == {7, 8, 9, 12}
+
+
+def test_uid_set_round_trip():
+    uids = {1, 2, 3, 10, 11, 40}
+    assert parse_uid_set(compress_uid_set(uids)) == uids
+
+
+def test_quote_string_escapes():
+    assert quote_string('a"b\\c') == '"a\\"b\\\\c"'
+
+
+class FlakyLoginIMAP:
+    """imaplib.IMAP4_SSL stand-in whose first connection fails to log in."""
+    connections = 0
+
+    def __init__(self, host, timeout=None):
+        FlakyLoginIMAP.connections += 1
+        self.attempt = FlakyLoginIMAP.connections
+        self.state = "NONAUTH"
+        self.capabilities = ("IMAP4REV1",)
+
+    def login(self, user, password):
+        if self.attempt == 1:
+            raise imaplib.IMAP4.error("[UNAVAILABLE] try again")
+        self.state = "AUTH"
+        return "OK", [b"logged in"]
+
+    def capability(self):
+        return "OK", [b"IMAP4rev1"]
+
+    def select(self, mailbox):
+        self.state = "SELECTED"
+        return "OK", [b"3"]
+
+    def response(self, name):
+        return name, [b"7"] if name in ("UIDVALIDITY", "UIDNEXT") else [None]
+
+    def noop(self):
+        return "OK", [b"done"]
+
+    def logout(self):
+        self.state = "LOGOUT"
+        return "BYE", [b""]
+
+
+def test_failed_login_is_retried_on_a_fresh_connection(monkeypatch):
+    monkeypatch.setattr(imaplib, "IMAP4_SSL", FlakyLoginIMAP)
+    FlakyLoginIMAP.connections = 0
+    session = ImapSession("inbox", "imap.example.com", "me@example.com", "secret", max_retries=2, backoff_base=0)
+
+    session.call("noop")
+
+    assert FlakyLoginIMAP.connections == 2
+    assert session.mail.state == "SELECTED"
+    assert session.select_info["uidvalidity"] == 7
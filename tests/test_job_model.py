@@ -0,0 +1,30 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+import job_model
+from config import JOB_MODEL_MIN_EXAMPLES
+
+JOB_BLOB = "python contract role remote $90/hr c2c interview with the hiring manager"
+JUNK_BLOB = "huge sale today only, 50% off shoes and free shipping"
+
+
+@pytest.fixture
+def fresh_model(monkeypatch):
+    monkeypatch.setattr(job_model, "_model", job_model.new_model())
+    monkeypatch.setattr(job_model, "_updated", False)
+    return job_model._model
+
+
+def test_untrained_model_defers_to_rules(fresh_model):
+    job_model.learn(JUNK_BLOB, "promo@store.example", 0)
+    assert job_model.usable_model() is None
+    assert job_model.classify(JOB_BLOB, "jane@staffing.example") is None
+
+
+def test_model_classifies_once_it_has_seen_enough(fresh_model):
+    for _ in range(max(JOB_MODEL_MIN_EXAMPLES, 20)):
+        job_model.learn(JOB_BLOB, "jane@staffing.example", 1)
+        job_model.learn(JUNK_BLOB, "promo@store.example", 0)
+    assert job_model.usable_model() is fresh_model
+    assert job_model.classify(JOB_BLOB, "jane@staffing.example")[0] is True
+    assert job_model.classify(JUNK_BLOB, "promo@store.example")[0] is False
@@ -0,0 +1,37 @@
+from email_responder import CUE_INDEX
+from keyword_matcher import compile_terms, match_terms, split_words
+
+INDEX = compile_terms({"job": ("contract", "contract-to-hire", "book a call"), "utility": ("pg&e",)})
+
+
+def test_whole_words_and_plurals_match():
+    assert match_terms("two contracts available", INDEX) == {"job"}
+    assert match_terms("contract, remote", INDEX) == {"job"}
+    assert match_terms("a subcontracted job", INDEX) == set()
+
+
+def test_phrases_match_across_punctuation():
+    assert match_terms("please book-a-call today", INDEX) == {"job"}
+    assert match_terms("open to contract to hire", INDEX) == {"job"}
+    assert match_terms("book the call", INDEX) == set()
+
+
+def test_ampersand_stays_part_of_a_word():
+    assert match_terms("your pg&e bill", INDEX) == {"utility"}
+    assert match_terms("pg and e", INDEX) == set()
+
+
+def test_split_words_drops_punctuation():
+    assert split_words("hi, jane! $90/hr.") == [b"hi", b"jane", b"90", b"hr"]
+
+
+def test_recruiter_inflections_are_cues():
+    # Substring matching used to catch these; whole-word matching needs them listed
+    assert "medium_pos" in match_terms("looking for a contractor", CUE_INDEX)
+    assert "medium_pos" in match_terms("we are interviewing this week", CUE_INDEX)
+    assert "strong_pos" in match_terms("recruiting for a client", CUE_INDEX)
+
+
+def test_words_inside_other_words_are_not_cues():
+    assert match_terms("corporate payroll control", CUE_INDEX) == set()
+    assert match_terms("we will demonstrate the product", CUE_INDEX) == set()
@@ -0,0 +1,35 @@
+import datetime
+import pytest
+import main
+
+JOB_BODY = " ".join(["We are hiring a senior Python developer for a six month contract, fully remote, $90/hr on C2C."] * 5)
+NEWSLETTER_BODY = " ".join(["Huge discount on every webinar seat this week. Unsubscribe or manage preferences."] * 5)
+
+
+@pytest.fixture
+def decisions(monkeypatch):
+    """Run _process_emails offline: no prompts or state files, cluster calls recorded."""
+    calls = {"clusters": [], "decisions": []}
+    monkeypatch.setattr(main, "recruiter_has_replied", lambda sender, email_date: True)
+    monkeypatch.setattr(main, "mark_message", lambda email_id, keyword: None)
+    monkeypatch.setattr(main, "assign_cluster", lambda *args: calls["clusters"].append(args))
+    monkeypatch.setattr(main, "set_decision", lambda cluster, email_id, decision: calls["decisions"].append(decision))
+    monkeypatch.setattr("builtins.input", lambda prompt="": pytest.fail("prompted for a decision"))
+    return calls
+
+
+def email(subject, sender, body):
+    return main.ParsedEmail(datetime.datetime(2026, 10, 5, 10, 0), sender, subject, body, is_html=False)
+
+
+def test_newsletter_never_enters_the_duplicate_index(decisions):
+    main._process_emails([email("New contract role openings", "Deals <deals@shop.example>", NEWSLETTER_BODY)], {})
+    assert decisions["clusters"] == []
+    assert decisions["decisions"] == []
+
+
+def test_empty_draft_is_not_marked_drafted(decisions, monkeypatch):
+    monkeypatch.setattr(main, "generate_response", lambda *args: "")
+    main._process_emails([email("Python contract role", "Jane <jane@staffing.example>", JOB_BODY)], {})
+    assert len(decisions["clusters"]) == 1
+    assert decisions["decisions"] == []
@@ -0,0 +1,21 @@
+import os
+from message_cache import MessageCache
+
+
+def test_iter_mailbox_orders_uidvalidity_numerically(tmp_path):
+    cache = MessageCache(root=str(tmp_path))
+    cache.put("me@example.com@imap/inbox", 9, 1, b"old")
+    cache.put("me@example.com@imap/inbox", 10, 2, b"new")
+    cache.put("me@example.com@imap/inbox", 10, 3, b"newest")
+    os.makedirs(os.path.join(cache.mailbox_dir("me@example.com@imap/inbox", "10"), os.pardir, "tmp"))
+
+    assert list(cache.iter_mailbox("me@example.com@imap/inbox")) == [(10, 3, b"newest"), (10, 2, b"new"),
+                                                                    (9, 1, b"old")]
+
+
+def test_get_round_trips_and_misses(tmp_path):
+    cache = MessageCache(root=str(tmp_path))
+    cache.put("box", 1, 5, b"raw message")
+    assert cache.get("box", 1, 5) == b"raw message"
+    assert cache.get("box", 2, 5) is None
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,22 @@
+from near_duplicates import simhash
+
+JOB = (" ".join(f"we are hiring a senior python developer for a six month contract with our client number {i} "
+                "fully remote with a rate of ninety dollars per hour on c2c" for i in range(3)))
+
+
+def distance(a, b):
+    return (simhash(a) ^ simhash(b)).bit_count()
+
+
+def test_short_text_has_no_fingerprint():
+    assert simhash("python contract, remote") is None
+
+
+def test_copies_with_different_greetings_are_close():
+    assert distance(f"hi steven {JOB} thanks jane", f"hello there {JOB} best regards bob") <= 12
+
+
+def test_different_jobs_are_far_apart():
+    other = (" ".join(f"our store has a huge sale on shoes this weekend with {i} free gifts for every order "
+                      "and free shipping on everything you buy online today" for i in range(3)))
+    assert distance(JOB, other) > 12
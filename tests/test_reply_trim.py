@@ -0,0 +1,54 @@
+from html_text import plain_to_text
+from reply_trim import trim_reply
+
+
+def test_quoted_history_is_cut():
+    text = "Are you available Tuesday?\nOn Mon, Oct 5, 2026 at 10:00 AM Jane Doe <jane@example.com> wrote:\n> Thanks"
+    assert trim_reply(text) == "Are you available Tuesday?"
+
+
+def test_outlook_header_block_is_cut():
+    text = "Sounds good.\nFrom: Jane Doe\nSent: Monday, October 5, 2026\nSubject: Python role"
+    assert trim_reply(text) == "Sounds good."
+
+
+def test_message_that_is_all_quote_is_kept():
+    text = "> Python contract role\n> Remote"
+    assert trim_reply(text) == text
+
+
+def test_legal_footer_is_cut():
+    text = ("Python contract, remote, $90/hr.\nThis email and any attachments are intended solely for the "
+            "addressee and may be privileged.")
+    assert trim_reply(text) == "Python contract, remote, $90/hr."
+    assert trim_reply("Python contract.\nCONFIDENTIALITY NOTICE: do not forward.") == "Python contract."
+
+
+def test_confidential_job_details_are_kept():
+    text = "Hi,\nThis email is regarding a confidential client in fintech, fully remote, $90/hr."
+    assert trim_reply(text) == text
+    text = "Hi,\nConfidential: the client is a bank.\nRemote, $90/hr."
+    assert trim_reply(text) == text
+
+
+def test_rfc3676_signature_is_cut_after_whitespace_collapsing():
+    text = plain_to_text("Python contract, remote.\n-- \nJane Doe\nSenior Recruiter\n")
+    assert trim_reply(text) == "Python contract, remote."
+
+
+def test_bare_dashes_are_content():
+    text = plain_to_text("Role details\n--\nPython\nRemote")
+    assert trim_reply(text) == text
+
+
+def test_forwarded_job_description_is_kept():
+    text = plain_to_text(
+        "Hi Steven, please see the JD below and let me know.\n\n"
+        "---------- Forwarded message ---------\n"
+        "From: Jane Doe <jane@client.example>\nDate: Mon, Oct 5, 2026 at 10:00 AM\n"
+        "Subject: Senior Python Developer\nTo: Bob <bob@vendor.example>\n\n"
+        "Senior Python Developer, 6 month contract, remote, $90/hr C2C.\n"
+        "On Sun, Oct 4, 2026 Bob wrote:\n> Do you have anything open?")
+    trimmed = trim_reply(text)
+    assert "6 month contract, remote, $90/hr C2C." in trimmed
+    assert "Bob wrote" not in trimmed  # Reply history inside the forward is still cut
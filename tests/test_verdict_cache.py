@@ -0,0 +1,14 @@
+from verdict_cache import verdict_key
+
+
+def test_message_id_is_the_key():
+    assert verdict_key("<abc@example.com>", "jane@example.com", "Role", "body") == "id:<abc@example.com>"
+
+
+def test_key_without_message_id_hashes_the_content():
+    key = verdict_key(None, "jane@example.com", "Role", "body")
+    assert key.startswith("sha:")
+    assert key == verdict_key("", "jane@example.com", "Role", "body")
+    assert key != verdict_key(None, "jane@example.com", "Role", "body!")
+    # Fields are separated, so moving text between them changes the key
+    assert verdict_key(None, "a", "bc", "") != verdict_key(None, "ab", "c", "")
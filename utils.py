@@ -1,5 +1,6 @@
 import json
 import os
+import time
 
 def load_json_file(filename):
     """Load JSON data from a file, or return an empty dictionary if the file does not exist."""
@@ -21,3 +22,22 @@ def clear_skipped_emails():
         print("✅ Skipped emails cache has been cleared.")
     else:
         print("❌ Skipped emails cache was NOT cleared.")
+
+class ProgressReporter:
+    """Throttled progress line: prints at most once per interval and never sleeps, so it can't stall I/O."""
+
+    def __init__(self, total, label, interval=2.0):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_print = 0.0
+
+    def update(self, done, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_print < self.interval:
+            return
+        self.last_print = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(f"{self.label} {done}/{self.total} ({rate:.0f}/s)", flush=True)
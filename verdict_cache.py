@@ -0,0 +1,77 @@
+import hashlib
+from collections import Counter
+from config import VERDICT_CACHE, VERDICT_CACHE_MAX_ENTRIES
+from utils import load_json_file, save_json_file
+
+# key -> [ruleset version, is_job, score, reasons]; loaded on first use, written by save_verdicts
+_verdicts = None
+_changed = False
+verdict_stats = Counter()  # hits, misses since the last report
+
+
+def verdict_key(message_id, sender, subject, raw_body):
+    """
+    Cache key for a message: its Message-ID, or a hash of sender, subject and raw body when it has none.
+    Neither needs the body cleaned, so a hit skips all of the classification work.
+    """
+    if message_id:
+        return f"id:{message_id}"
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (sender, subject, raw_body):
+        digest.update((value or "").encode("utf-8", errors="replace"))
+        digest.update(b"\0")
+    return f"sha:{digest.hexdigest()}"
+
+
+def _load():
+    global _verdicts
+    if _verdicts is None:
+        _verdicts = load_json_file(VERDICT_CACHE) if VERDICT_CACHE else {}
+    return _verdicts
+
+
+def get_verdict(key, version):
+    """The cached (is_job, score, reasons) for key under this ruleset version, or None."""
+    if not VERDICT_CACHE or version is None:
+        return None
+    entry = _load().get(key)
+    if entry is None or entry[0] != version:  # Unknown, or scored by other rules
+        verdict_stats["misses"] += 1
+        return None
+    verdict_stats["hits"] += 1
+    return entry[1], entry[2], list(entry[3])
+
+
+def put_verdict(key, version, verdict):
+    global _changed
+    if not VERDICT_CACHE or version is None:
+        return
+    verdicts = _load()
+    verdicts.pop(key, None)  # Re-insert at the end: dict order is the eviction order
+    is_job, score, reasons = verdict
+    verdicts[key] = [version, bool(is_job), score, list(reasons)]
+    _changed = True
+
+
+def save_verdicts(version):
+    """
+    Write the store if anything changed this run, dropping entries of other ruleset versions (those
+    messages are rescored when next seen) and the oldest ones beyond VERDICT_CACHE_MAX_ENTRIES.
+    A None version (the learned model took over during the run) leaves the store as it is.
+    """
+    global _verdicts, _changed
+    if not _changed or version is None:
+        return
+    current = [(key, entry) for key, entry in _load().items() if entry[0] == version]
+    _verdicts = dict(current[-VERDICT_CACHE_MAX_ENTRIES:])
+    save_json_file(VERDICT_CACHE, _verdicts)
+    _changed = False
+
+
+def report_verdicts():
+    """One-line hit/miss summary since the last call (then reset), or "" when the cache wasn't used."""
+    if not verdict_stats:
+        return ""
+    summary = f"{verdict_stats['hits']} reused, {verdict_stats['misses']} scored"
+    verdict_stats.clear()
+    return summary